@@ -1,9 +1,12 @@
 from fastapi import APIRouter
 
-from app.api.endpoints import estimate_settings
+from app.api.endpoints import estimate_api, estimate_settings
 
 router = APIRouter()
 
 router.include_router(
     router=estimate_settings.router, prefix="/estimate", tags=["estimate_car_value"]
 )
+router.include_router(
+    router=estimate_api.router, prefix="/api/estimate", tags=["estimate_api"]
+)
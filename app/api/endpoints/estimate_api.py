@@ -0,0 +1,48 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import Response
+
+from app.api.validation import build_estimate_request
+from app.controllers import EstimateController
+from app.core.factory import Factory
+from app.schemas.responses.estimate import EstimateResponse
+
+router = APIRouter()
+
+
+@router.get("", response_model=EstimateResponse)
+async def get_estimate(
+    year: int = Query(...),
+    make: str = Query(...),
+    model: str = Query(...),
+    mileage: Optional[int] = Query(0),
+    state: Optional[str] = Query(None),
+    zip_code: Optional[str] = Query(None),
+    radius_miles: Optional[float] = Query(None),
+    include_samples: bool = Query(True),
+    estimate_controller: EstimateController = Depends(
+        Factory().get_estimate_controller
+    ),
+):
+    estimate_request = build_estimate_request(
+        year=year,
+        make=make,
+        model=model,
+        mileage=mileage,
+        state=state,
+        zip_code=zip_code,
+        radius_miles=radius_miles,
+    )
+    response: EstimateResponse = await estimate_controller.get_estimate(
+        estimate_request, include_samples=include_samples
+    )
+
+    # Serialize with pydantic-core directly instead of FastAPI's
+    # jsonable_encoder, which walks the response in Python.
+    return Response(
+        content=response.model_dump_json(
+            exclude=None if include_samples else {"samples"}
+        ),
+        media_type="application/json",
+    )
@@ -1,12 +1,19 @@
 from typing import Optional
-from fastapi import HTTPException
 from fastapi import APIRouter, Depends, Request, Form
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 
+from app.api.validation import build_estimate_request
 from app.controllers import EstimateController
+from app.controllers.estimate_controller import (
+    db_admission,
+    estimate_admission,
+    estimate_cache,
+    estimate_single_flight,
+)
+from app.controllers.estimate_prewarm import estimate_prewarmer
 from app.core.factory import Factory
-from app.schemas.requests.estimate import EstimateRequest
+from app.integration.inference import inference_executor
 from app.schemas.responses.estimate import EstimateResponse
 
 router = APIRouter()
@@ -15,9 +22,21 @@ templates = Jinja2Templates(directory="app/templates")
 
 @router.get("/", response_class=HTMLResponse)
 async def show_estimate_form(request: Request):
-    return templates.TemplateResponse(
-        "estimate_form_with_result.html", {"request": request}
-    )
+    return templates.TemplateResponse(request, "estimate_form_with_result.html")
+
+
+@router.get("/metrics")
+async def estimate_metrics():
+    return {
+        "coalescing": estimate_single_flight.stats(),
+        "cache": estimate_cache.stats(),
+        "prewarm": estimate_prewarmer.stats(),
+        "inference": inference_executor.stats(),
+        "admission": {
+            "route": estimate_admission.stats(),
+            "db": db_admission.stats(),
+        },
+    }
 
 
 @router.post("/")
@@ -27,32 +46,42 @@ async def estimate_value(
     make: str = Form(...),
     model: str = Form(...),
     mileage: Optional[int] = Form(0),
+    state: Optional[str] = Form(None),
+    zip_code: Optional[str] = Form(None),
+    radius_miles: Optional[float] = Form(None),
     estimate_controller: EstimateController = Depends(
         Factory().get_estimate_controller
     ),
 ):
-    if year > 2024 or year < 0:
-        raise HTTPException(status_code=400, detail="Year must be between 0 and 2024.")
-
-    if mileage is not None and mileage < 0:
-        raise HTTPException(status_code=400, detail="Mileage cannot be negative.")
-
-    estimate_request = EstimateRequest(
-        year=year, make=make, model=model, mileage=mileage
+    estimate_request = build_estimate_request(
+        year=year,
+        make=make,
+        model=model,
+        mileage=mileage,
+        state=state,
+        zip_code=zip_code,
+        radius_miles=radius_miles,
     )
     response: EstimateResponse = await estimate_controller.get_estimate(
         estimate_request
     )
 
     return templates.TemplateResponse(
+        request,
         "estimate_form_with_result.html",
         {
-            "request": request,
             "average_price": response.average_price,
             "samples": response.samples,
+            "price_p10": response.price_p10,
+            "price_p50": response.price_p50,
+            "price_p90": response.price_p90,
+            "fallback_used": response.fallback_used,
             "year": year,
             "make": make,
             "model": model,
             "mileage": mileage,
+            "state": state,
+            "zip_code": zip_code,
+            "radius_miles": radius_miles,
         },
     )
@@ -0,0 +1,17 @@
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from app.schemas.requests.estimate import EstimateRequest
+
+
+def build_estimate_request(**params) -> EstimateRequest:
+    """
+    Builds an ``EstimateRequest`` from route parameters. Invalid parameters
+    are answered with a 400 carrying the validator's message.
+    """
+    try:
+        return EstimateRequest(**params)
+    except ValidationError as exception:
+        error = exception.errors()[0]
+        detail = error.get("ctx", {}).get("error", error["msg"])
+        raise HTTPException(status_code=400, detail=str(detail))
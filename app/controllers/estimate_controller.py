@@ -1,30 +1,172 @@
-from typing import List
+from typing import Hashable, List, Optional, Tuple
+from uuid import uuid4
 
 from app.controllers.base import BaseController
+from app.core.config import config
+from app.core.database.session import (
+    reset_session_context,
+    session,
+    set_session_context,
+)
 from app.core.exceptions.base import NotFoundException
-from app.integration.lr_model import VehiclePriceEstimator
+from app.integration.inference import inference_executor
+from app.integration.quantile_sketch import KLLSketch
+from app.integration.comparables import weighted_price
+from app.integration.serving_snapshot import comparable_index, snapshot_quantile_store
 from app.models.estimate import Vehicle
-from app.repositories import EstimateRepository
+from app.repositories import EstimateRepository, ZipCentroidRepository
 from app.schemas.responses.estimate import EstimateResponse, VehicleSample
+from app.utils.admission import (
+    PRIORITY_HIGH,
+    PRIORITY_LOW,
+    PRIORITY_NORMAL,
+    AdmissionController,
+)
+from app.utils.result_cache import GenerationCache
+from app.utils.single_flight import SingleFlight
+from app.utils.top_k import SpaceSavingCounter
+
+estimate_single_flight = SingleFlight()
+estimate_cache = GenerationCache(max_entries=config.ESTIMATE_CACHE_SIZE)
+popular_segments = SpaceSavingCounter(capacity=config.POPULAR_SEGMENTS_CAPACITY)
+estimate_admission = AdmissionController(
+    name="Estimate service",
+    max_concurrency=config.ESTIMATE_MAX_CONCURRENCY,
+    max_queue=config.ESTIMATE_MAX_QUEUE,
+    queue_timeout=config.ESTIMATE_QUEUE_TIMEOUT_MS / 1000,
+    retry_after=config.ADMISSION_RETRY_AFTER_SECONDS,
+)
+db_admission = AdmissionController(
+    name="Database pool",
+    max_concurrency=config.DB_POOL_SIZE + config.DB_MAX_OVERFLOW,
+    max_queue=config.ESTIMATE_MAX_CONCURRENCY,
+    queue_timeout=config.DB_QUEUE_TIMEOUT_MS / 1000,
+    retry_after=config.ADMISSION_RETRY_AFTER_SECONDS,
+)
 
 
 class EstimateController(BaseController[Vehicle]):
-    def __init__(self, estimate_repository: EstimateRepository) -> None:
+    def __init__(
+        self,
+        estimate_repository: EstimateRepository,
+        zip_centroid_repository: ZipCentroidRepository,
+    ) -> None:
         super().__init__(model=Vehicle, repository=estimate_repository)
         self.estimate_repository: EstimateRepository = estimate_repository
-        self.estimator = VehiclePriceEstimator(model_path="app/regression_model.json")
-        self.estimator.load_model()
+        self.zip_centroid_repository: ZipCentroidRepository = zip_centroid_repository
+        self.inference_executor = inference_executor
+        self.quantile_store = snapshot_quantile_store
+        self.comparable_index = comparable_index
 
-    async def get_estimate(self, request) -> EstimateResponse:
+    async def get_estimate(
+        self, request, include_samples: bool = True
+    ) -> EstimateResponse:
+        popular_segments.add((request.year, request.make, request.model))
 
-        vehicles: List[Vehicle] = await self.estimate_repository.get_estimate(
-            make=request.make,
-            year=request.year,
-            model=request.model,
-            listing_mileage=request.mileage,
+        key = self._cache_key(request, include_samples)
+        generation = self._generation()
+        cached = estimate_cache.get(key, generation)
+        if cached is None and not include_samples:
+            # A cached response with samples also answers a request without.
+            full = estimate_cache.get(self._cache_key(request, True), generation)
+            if full is not None:
+                cached = full.model_copy(update={"samples": []})
+        if cached is not None:
+            return cached
+
+        priority = self._priority(request)
+        compute = self._cached_compute(key, generation, request, include_samples, priority)
+
+        # Joining a computation already in flight costs no extra work.
+        if estimate_single_flight.in_flight(key):
+            return await estimate_single_flight.do(key, compute)
+
+        async with estimate_admission.admit(priority):
+            return await estimate_single_flight.do(key, compute)
+
+    async def warm(self, request) -> bool:
+        """
+        Computes and caches the estimate at the lowest priority, unless it is
+        already cached for the current serving version.
+
+        :return: Whether an estimate was computed.
+        :raises ServiceUnavailableException: When live traffic has the slots.
+        """
+        key = self._cache_key(request, True)
+        generation = self._generation()
+        if estimate_cache.contains(key, generation):
+            return False
+
+        compute = self._cached_compute(key, generation, request, True, PRIORITY_LOW)
+        async with estimate_admission.admit(PRIORITY_LOW):
+            await estimate_single_flight.do(key, compute)
+        return True
+
+    @staticmethod
+    def _cache_key(request, include_samples: bool) -> Tuple:
+        return (tuple(request.model_dump().values()), include_samples)
+
+    def _generation(self) -> Hashable:
+        return self.inference_executor.version()
+
+    def _cached_compute(
+        self, key, generation, request, include_samples: bool, priority: int
+    ):
+        async def compute():
+            # The computation is shared and may outlive the request that
+            # started it, whose session is removed when that request ends,
+            # so it runs on a session of its own.
+            context = set_session_context(session_id=str(uuid4()))
+            try:
+                response = await self._compute_estimate(
+                    request, include_samples, priority
+                )
+            finally:
+                await session.remove()
+                reset_session_context(context=context)
+            estimate_cache.put(key, generation, response)
+            return response
+
+        return compute
+
+    def _priority(self, request) -> int:
+        segment_count = self.quantile_store.segment_count(
+            year=request.year, make=request.make, model=request.model
         )
+        if segment_count is not None and segment_count <= config.CHEAP_SEGMENT_ROWS:
+            return PRIORITY_HIGH
+        return PRIORITY_NORMAL
+
+    async def _compute_estimate(
+        self, request, include_samples: bool, priority: int
+    ) -> EstimateResponse:
+        async with db_admission.admit(priority):
+            zip_codes = None
+            if request.zip_code is not None and request.radius_miles is not None:
+                zip_codes = await self.zip_centroid_repository.get_zips_within(
+                    zip_code=request.zip_code, radius_miles=request.radius_miles
+                )
+                if zip_codes is None:
+                    raise NotFoundException(custom_msg="Unknown ZIP code.")
+
+            vehicles: List[Vehicle] = await self.estimate_repository.get_estimate(
+                make=request.make,
+                year=request.year,
+                model=request.model,
+                listing_mileage=request.mileage,
+                state=request.state,
+                zip_codes=zip_codes,
+            )
+            # Hand the connection back before inference, so connections in
+            # use never outnumber the slots of this limiter.
+            await session.close()
 
         if not vehicles:
+            if request.state is None and zip_codes is None:
+                response = self._estimate_from_comparables(request, include_samples)
+                if response is not None:
+                    return response
+
             raise NotFoundException(
                 custom_msg="No vehicles found for the given year, make, and model.",
             )
@@ -35,18 +177,18 @@ class EstimateController(BaseController[Vehicle]):
             if vehicle.listing_price is not None
         ) / len(vehicles)
 
-        adjusted_price = self.estimator.calculate_adjusted_price(
-            base_price=base_price,
-            mileage=request.mileage,
-            year=request.year,
-            make=request.make,
-            model=request.model,
-        )
+        if request.mileage is None:
+            adjusted_price = base_price
+        else:
+            adjusted_price = await self.inference_executor.predict(
+                (request.mileage, request.year, request.make, request.model)
+            )
 
         average_price = round(adjusted_price, -2)
 
+        # Rows come straight from the database, so skip per-field validation.
         samples: List[VehicleSample] = [
-            VehicleSample(
+            VehicleSample.model_construct(
                 year=vehicle.year,
                 make=vehicle.make,
                 model=vehicle.model,
@@ -54,7 +196,76 @@ class EstimateController(BaseController[Vehicle]):
                 listing_mileage=vehicle.listing_mileage,
                 dealer_city=vehicle.dealer_city,
             )
-            for vehicle in vehicles[:100]
+            for vehicle in (vehicles[:100] if include_samples else [])
         ]
 
-        return EstimateResponse(average_price=average_price, samples=samples)
+        if request.state is None and zip_codes is None:
+            sketch = self.quantile_store.get_sketch(
+                year=request.year,
+                make=request.make,
+                model=request.model,
+                max_mileage=request.mileage,
+            )
+        else:
+            # Segment sketches are national, so summarise the regional rows.
+            sketch = KLLSketch()
+            sketch.update_many(
+                vehicle.listing_price
+                for vehicle in vehicles
+                if vehicle.listing_price is not None
+            )
+            sketch = sketch if sketch.count else None
+        p10, p25, p50, p75, p90 = (
+            sketch.quantiles([0.1, 0.25, 0.5, 0.75, 0.9])
+            if sketch is not None
+            else [None] * 5
+        )
+
+        return EstimateResponse(
+            average_price=average_price,
+            samples=samples,
+            price_p10=p10,
+            price_p50=p50,
+            price_p90=p90,
+            confidence_low=p25,
+            confidence_high=p75,
+        )
+
+    def _estimate_from_comparables(
+        self, request, include_samples: bool
+    ) -> Optional[EstimateResponse]:
+        comparables = self.comparable_index.nearest(
+            year=request.year,
+            make=request.make,
+            model=request.model,
+            mileage=request.mileage,
+        )
+        if not comparables:
+            return None
+
+        sketch = KLLSketch()
+        sketch.update_many(comparable.price for comparable in comparables)
+        p10, p25, p50, p75, p90 = sketch.quantiles([0.1, 0.25, 0.5, 0.75, 0.9])
+
+        samples: List[VehicleSample] = [
+            VehicleSample.model_construct(
+                year=comparable.year,
+                make=request.make,
+                model=comparable.model,
+                listing_price=int(comparable.price),
+                listing_mileage=comparable.mileage,
+                dealer_city=None,
+            )
+            for comparable in (comparables if include_samples else [])
+        ]
+
+        return EstimateResponse(
+            average_price=round(weighted_price(comparables), -2),
+            samples=samples,
+            price_p10=p10,
+            price_p50=p50,
+            price_p90=p90,
+            confidence_low=p25,
+            confidence_high=p75,
+            fallback_used=True,
+        )
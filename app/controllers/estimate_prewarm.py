@@ -0,0 +1,175 @@
+import asyncio
+import os
+from typing import Hashable, Optional
+from uuid import uuid4
+
+from app.controllers.estimate_controller import (
+    estimate_admission,
+    popular_segments,
+)
+from app.core.config import config
+from app.core.database.session import (
+    reset_session_context,
+    session,
+    set_session_context,
+)
+from app.core.exceptions.base import NotFoundException, ServiceUnavailableException
+from app.core.factory import Factory
+from app.integration.inference import inference_executor
+from app.schemas.requests.estimate import EstimateRequest
+from app.utils.file_lock import file_lock
+from app.utils.logger import app_logger
+from app.utils.top_k import SpaceSavingCounter
+
+
+class EstimatePrewarmer:
+    """
+    Background task that precomputes the estimates of the most requested
+    segments whenever the serving version changes (a fresh ingest, a new
+    snapshot model or a replaced model file), so popular requests do not
+    start cold.
+
+    Warming is throttled: it pauses while the estimate route is busy, runs
+    at the lowest admission priority and sleeps between estimates.
+
+    Each worker counts its own requests in ``popular_segments`` and merges
+    them into the popularity file shared by all workers, so every worker
+    warms the segments that are popular across the server.
+    """
+
+    def __init__(
+        self,
+        top_k: int,
+        interval: float,
+        check_interval: float,
+        max_load: float,
+        state_path: str,
+    ):
+        self.top_k = top_k
+        self.interval = interval
+        self.check_interval = check_interval
+        self.max_load = max_load
+        self.state_path = state_path
+        self.warmed_generation: Optional[Hashable] = None
+        self.runs = 0
+        self.warmed = 0
+        self.skipped = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.share_popularity()
+
+    async def share_popularity(
+        self, generation: Optional[Hashable] = None
+    ) -> SpaceSavingCounter:
+        """
+        Merges this worker's counts since the last merge into the shared
+        popularity file, under a lock so that concurrent workers do not
+        lose each other's counts.
+
+        :param generation: The serving generation being warmed. The shared
+            counts are decayed once per generation, whichever worker gets
+            there first, so that recent traffic dominates.
+        :return: The merged counts.
+        """
+        shared = SpaceSavingCounter(capacity=popular_segments.capacity)
+        async with file_lock(f"{self.state_path}.lock"):
+            if os.path.exists(self.state_path):
+                try:
+                    shared.load(self.state_path)
+                except ValueError as exception:
+                    # Includes JSONDecodeError. Popularity only steers
+                    # warming, so start counting afresh.
+                    app_logger.warning(
+                        f"Ignoring unreadable popular segments file: {exception}"
+                    )
+            shared.merge(popular_segments)
+            popular_segments.clear()
+
+            if generation is not None and shared.epoch != str(generation):
+                shared.decay()
+                shared.epoch = str(generation)
+            shared.save(self.state_path)
+        return shared
+
+    async def _run(self) -> None:
+        while True:
+            generation = inference_executor.version()
+            # Without a snapshot there is nothing to warm from yet.
+            if generation[0] is not None and generation != self.warmed_generation:
+                try:
+                    await self.warm(generation)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    app_logger.exception("Estimate prewarming failed.")
+            await asyncio.sleep(self.check_interval)
+
+    async def warm(self, generation: Hashable) -> None:
+        """
+        Warms the most popular segments across the workers for one serving
+        generation.
+        """
+        self.runs += 1
+        segments = (await self.share_popularity(generation)).top(self.top_k)
+        warmed = 0
+
+        for (year, make, model), _ in segments:
+            while estimate_admission.busy(self.max_load):
+                await asyncio.sleep(self.interval)
+
+            request = EstimateRequest(year=year, make=make, model=model, mileage=0)
+            try:
+                if await self._warm_one(request):
+                    warmed += 1
+            except NotFoundException:
+                self.skipped += 1
+            except ServiceUnavailableException:
+                # Live traffic took the slots; retry on the next generation.
+                self.skipped += 1
+            await asyncio.sleep(self.interval)
+
+        self.warmed += warmed
+        self.warmed_generation = generation
+        app_logger.info(
+            f"Prewarmed {warmed} of {len(segments)} popular estimates "
+            f"for serving generation {generation}."
+        )
+
+    async def _warm_one(self, request: EstimateRequest) -> bool:
+        context = set_session_context(session_id=str(uuid4()))
+        try:
+            controller = Factory().get_estimate_controller(db_session=session)
+            return await controller.warm(request)
+        finally:
+            await session.remove()
+            reset_session_context(context=context)
+
+    def stats(self) -> dict:
+        return {
+            "warmed_generation": self.warmed_generation,
+            "runs": self.runs,
+            "warmed": self.warmed,
+            "skipped": self.skipped,
+            "popular_segments": popular_segments.stats(),
+        }
+
+
+estimate_prewarmer = EstimatePrewarmer(
+    top_k=config.PREWARM_TOP_K,
+    interval=config.PREWARM_INTERVAL_MS / 1000,
+    check_interval=config.PREWARM_CHECK_SECONDS,
+    max_load=config.PREWARM_MAX_LOAD,
+    state_path=config.POPULAR_SEGMENTS_PATH,
+)
@@ -1,14 +1,15 @@
 from contextvars import ContextVar, Token
 from typing import Union
 
+from sqlalchemy.engine import URL, make_url
 from sqlalchemy.ext.asyncio import (
     AsyncSession,
     async_scoped_session,
+    create_async_engine,
 )
 from sqlalchemy.orm import declarative_base
 from app.core.config import config
 
-from sqlalchemy import create_engine
 from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.sql.expression import Delete, Insert, Update
 from app.core.config import config
@@ -17,7 +18,36 @@ from app.core.config import config
 Base = declarative_base()
 session_context: ContextVar[str] = ContextVar("session_context")
 
-engine = create_engine(config.DATABASE_URL, pool_recycle=3600)
+# Async DBAPI driver per backend. DATABASE_URL names a sync driver, which
+# alembic and create_db keep using; the application sessions run on the
+# async driver so queries wait on the event loop instead of blocking it.
+ASYNC_DRIVERS = {
+    "mysql": "aiomysql",
+    "sqlite": "aiosqlite",
+}
+
+
+def async_database_url(database_url: str) -> URL:
+    """
+    Returns ``database_url`` with its driver replaced by the async driver
+    for the same backend. URLs that already name an async driver, or a
+    backend without an entry in ``ASYNC_DRIVERS``, are returned unchanged.
+    """
+    url = make_url(database_url)
+    if url.get_dialect().is_async:
+        return url
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        return url
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}")
+
+
+engine = create_async_engine(
+    async_database_url(config.DATABASE_URL),
+    pool_recycle=3600,
+    pool_size=config.DB_POOL_SIZE,
+    max_overflow=config.DB_MAX_OVERFLOW,
+)
 
 
 def get_session_context() -> str:
@@ -35,8 +65,8 @@ def reset_session_context(context: Token) -> None:
 class RoutingSession(Session):
     def get_bind(self, mapper=None, clause=None, **kwargs):
         if self._flushing or isinstance(clause, (Update, Delete, Insert)):
-            return engine
-        return engine
+            return engine.sync_engine
+        return engine.sync_engine
 
 
 async_session_factory = sessionmaker(
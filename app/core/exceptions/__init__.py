@@ -1,7 +1,11 @@
 from .base import (
+    APIException,
     NotFoundException,
+    ServiceUnavailableException,
 )
 
 __all__ = [
+    "APIException",
     "NotFoundException",
+    "ServiceUnavailableException",
 ]
@@ -37,3 +37,20 @@ class NotFoundException(APIException):
             code=f"{HTTPStatus.NOT_FOUND.value}{'1'.zfill(4)}",
             ex=ex,
         )
+
+
+class ServiceUnavailableException(APIException):
+    def __init__(
+        self, custom_msg: str = None, retry_after: int = 1, ex: Exception = None
+    ):
+        default_msg = HTTPStatus.SERVICE_UNAVAILABLE.phrase
+        detail_msg = f"{custom_msg}" if custom_msg else default_msg
+        self.retry_after = retry_after
+
+        super().__init__(
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+            msg=HTTPStatus.SERVICE_UNAVAILABLE.phrase,
+            detail=detail_msg,
+            code=f"{HTTPStatus.SERVICE_UNAVAILABLE.value}{'1'.zfill(4)}",
+            ex=ex,
+        )
@@ -6,18 +6,23 @@ from app.controllers import (
     EstimateController,
 )
 from app.core.database.session import get_session
-from app.models import Vehicle
+from app.models import Vehicle, ZipCentroid
 from app.repositories import (
     EstimateRepository,
+    ZipCentroidRepository,
 )
 
 
 class Factory:
     estimate_repository = partial(EstimateRepository, Vehicle)
+    zip_centroid_repository = partial(ZipCentroidRepository, ZipCentroid)
 
     def get_estimate_controller(
         self, db_session=Depends(get_session)
     ) -> EstimateController:
         return EstimateController(
             estimate_repository=self.estimate_repository(db_session=db_session),
+            zip_centroid_repository=self.zip_centroid_repository(
+                db_session=db_session
+            ),
         )
@@ -1,24 +1,56 @@
+import gc
 from typing import List
+from uuid import uuid4
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware import Middleware
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
-import numpy as np
-import pandas as pd
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import insert
 
 from app.api.api import router
+from app.controllers.estimate_prewarm import estimate_prewarmer
 from app.core.config import config
 from app.core.database.create_db import validate_database
+from app.core.exceptions import APIException, ServiceUnavailableException
 from app.core.middlewares.sqlalchemy import SQLAlchemyMiddleware
-from app.core.database.session import get_session
+from app.core.database.session import (
+    reset_session_context,
+    session,
+    set_session_context,
+)
+from app.integration.ingest import (
+    INGEST_LOCK_PATH,
+    populate_snapshot,
+    populate_zip_centroids,
+    publish_serving_data,
+)
+from app.integration.inference import inference_executor
+from app.integration.serving_snapshot import serving_snapshot
 from app.models.estimate import Vehicle
-from app.repositories.base import BaseRepository
+from app.models.location import ZipCentroid
+from app.utils.file_lock import file_lock
 from app.utils.logger import app_logger
 
 
+async def populate_initial_data(session: AsyncSession) -> None:
+    result = await session.execute(select(ZipCentroid).limit(1))
+    if result.scalars().first() is None:
+        await populate_zip_centroids(session, config.ZIP_CENTROIDS_FILE_PATH)
+
+    result = await session.execute(select(Vehicle).limit(1))
+    if result.scalars().first() is None:
+        await populate_snapshot(session, config.DATA_FILE_PATH)
+        app_logger.info("Database populated with initial data.")
+        return
+
+    if serving_snapshot.current() is None:
+        await publish_serving_data(session)
+    app_logger.info("Database already contains data.")
+
+
 def init_db():
     validate_database()
 
@@ -27,6 +59,20 @@ def init_routers(app_: FastAPI) -> None:
     app_.include_router(router)
 
 
+def init_listeners(app_: FastAPI) -> None:
+    @app_.exception_handler(APIException)
+    async def api_exception_handler(request: Request, exc: APIException):
+        headers = None
+        if isinstance(exc, ServiceUnavailableException):
+            headers = {"Retry-After": str(exc.retry_after)}
+
+        return JSONResponse(
+            status_code=exc.status_code,
+            content={"code": exc.code, "msg": exc.msg, "detail": exc.detail},
+            headers=headers,
+        )
+
+
 def make_middleware() -> List[Middleware]:
     middleware = [
         Middleware(
@@ -52,30 +98,28 @@ def create_app() -> FastAPI:
 
     @app_.on_event("startup")
     async def startup_populate_data():
-        async for session in get_session():
-            vehicle_repo = BaseRepository(model=Vehicle, db_session=session)
-            result = await session.execute(select(Vehicle).limit(1))
-            vehicle_exists = result.scalars().first()
-            data_file_path = "data/NEWTEST-inventory-listing-2022-08-17.txt"
-            chunksize = 100
-
-            if vehicle_exists is None:
-                for chunk in pd.read_csv(
-                    data_file_path,
-                    delimiter="|",
-                    on_bad_lines="skip",
-                    chunksize=chunksize,
-                ):
-                    df_filtered = chunk.replace({np.nan: None})
-                    vehicles_data = df_filtered.to_dict(orient="records")
-
-                    await vehicle_repo.insert_many(vehicles_data)
-                    app_logger.info("Inserted a chunk of data into the database.")
-
-                await session.commit()
-                app_logger.info("Database populated with initial data.")
-            else:
-                app_logger.info("Database already contains data.")
+        # Move the objects created at import time out of the collector's
+        # reach, so full collections during ingest and request handling
+        # do not rescan them and stall the event loop.
+        gc.freeze()
+
+        # Every server worker runs this hook; the first one through the
+        # lock loads the data and the others find it in place. Daily
+        # snapshots are applied with ``python -m app.integration.ingest``.
+        async with file_lock(INGEST_LOCK_PATH):
+            context = set_session_context(session_id=str(uuid4()))
+            try:
+                await populate_initial_data(session)
+            finally:
+                await session.remove()
+                reset_session_context(context=context)
+
+        estimate_prewarmer.start()
+
+    @app_.on_event("shutdown")
+    async def shutdown_inference():
+        await estimate_prewarmer.close()
+        await inference_executor.close()
 
     app_.add_middleware(
         CORSMiddleware,
@@ -86,6 +130,7 @@ def create_app() -> FastAPI:
     )
     app_.add_middleware(SQLAlchemyMiddleware)
     init_routers(app_=app_)
+    init_listeners(app_=app_)
     return app_
 
 
@@ -0,0 +1,191 @@
+import joblib
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import LabelEncoder
+import pandas as pd
+import numpy as np
+
+from app.utils.text import normalize_name
+
+
+class BaseVehiclePriceEstimator:
+    """
+    Common interface for price model backends.
+
+    Subclasses provide ``_build_model`` and may override ``_predict`` and
+    the persistence methods. Predictions are always made on batches of
+    ``(mileage, year, make, model)`` rows, so callers can batch requests.
+    """
+
+    name = "base"
+
+    def __init__(self, model_path):
+        self.model_path = model_path
+        self.model = None
+        self.label_encoder_make = LabelEncoder()
+        self.label_encoder_model = LabelEncoder()
+        self.make_vocabulary = None
+        self.model_vocabulary = None
+        self.make_codes = {}
+        self.model_codes = {}
+
+    def train_model(self, data_file_path):
+        df = self._load_and_clean_data(data_file_path)
+        X_test, y_test = self.train_from_dataframe(df)
+        self.save_model()
+        return self.evaluate(X_test, y_test)
+
+    def train_from_dataframe(self, df, test_size=0.1):
+        """
+        Fits the model on all but a random ``test_size`` share of the rows.
+
+        :return: The encoded hold-out features and targets, indexed like ``df``.
+        """
+        X, y = self._prepare_features_and_target(df)
+
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=test_size, random_state=40
+        )
+
+        self._fit_model(X_train, y_train)
+        return X_test, y_test
+
+    def predict_features(self, X):
+        """
+        Predicts prices for already encoded features, such as the hold-out
+        set returned by ``train_from_dataframe``.
+        """
+        return self._predict(X.to_numpy(dtype=float))
+
+    def evaluate(self, X_test, y_test):
+        """
+        Returns the mean absolute error and mean absolute percentage error
+        of the model on a hold-out set. Zero prices are left out of the MAPE.
+        """
+        errors = np.abs(self.predict_features(X_test) - y_test.to_numpy(dtype=float))
+        actual = y_test.to_numpy(dtype=float)
+        nonzero = actual != 0
+
+        return {
+            "rows": int(len(actual)),
+            "mae": float(errors.mean()) if len(errors) else None,
+            "mape": float((errors[nonzero] / actual[nonzero]).mean())
+            if nonzero.any()
+            else None,
+        }
+
+    def _load_and_clean_data(self, data_file_path):
+        df = pd.read_csv(data_file_path, delimiter="|", on_bad_lines="skip")
+        return df.dropna(subset=["listing_mileage", "listing_price", "make", "model", "year"])
+
+    def _prepare_features_and_target(self, df):
+        X = df[["listing_mileage", "year", "make", "model"]].copy()
+        y = df["listing_price"]
+
+        X["make"] = self.label_encoder_make.fit_transform(
+            X["make"].astype(str).map(normalize_name)
+        )
+        X["model"] = self.label_encoder_model.fit_transform(
+            X["model"].astype(str).map(normalize_name)
+        )
+        self._build_codes()
+
+        return X, y
+
+    def _build_model(self):
+        raise NotImplementedError
+
+    def _fit_model(self, X_train, y_train):
+        self.model = self._build_model().fit(X_train.to_numpy(), y_train.to_numpy())
+
+    def save_model(self):
+        if self.model is None:
+            raise ValueError("No model found. Train the model before saving.")
+
+        joblib.dump(
+            {
+                "model": self.model,
+                "label_encoder_make_classes": self.label_encoder_make.classes_,
+                "label_encoder_model_classes": self.label_encoder_model.classes_,
+            },
+            self.model_path,
+        )
+
+    def load_model(self):
+        try:
+            model_data = joblib.load(self.model_path)
+        except FileNotFoundError:
+            raise FileNotFoundError(
+                f"Model file not found at {self.model_path}. Train and save the model first."
+            )
+
+        self.model = model_data["model"]
+        self.label_encoder_make.classes_ = model_data["label_encoder_make_classes"]
+        self.label_encoder_model.classes_ = model_data["label_encoder_model_classes"]
+        self._build_codes()
+
+    def _build_codes(self):
+        """
+        Builds the name to code lookups from the snapshot vocabularies when
+        loaded from one, otherwise from the label encoders. Call after the
+        classes change.
+        """
+        self.make_codes = self._codes(
+            self.label_encoder_make.classes_
+            if self.make_vocabulary is None
+            else self.make_vocabulary
+        )
+        self.model_codes = self._codes(
+            self.label_encoder_model.classes_
+            if self.model_vocabulary is None
+            else self.model_vocabulary
+        )
+
+    @staticmethod
+    def _codes(classes):
+        # Models trained before names were normalized may hold several
+        # spellings of a name; the first one keeps its code.
+        codes = {}
+        for code, name in enumerate(classes):
+            if isinstance(name, bytes):
+                name = name.decode()
+            codes.setdefault(normalize_name(str(name)), code)
+        return codes
+
+    @staticmethod
+    def _encode(values, codes):
+        return np.fromiter(
+            (codes.get(normalize_name(str(value)), 0) for value in values),
+            dtype=float,
+            count=len(values),
+        )
+
+    def _features(self, rows):
+        mileages, years, makes, models = zip(*rows)
+        features = np.empty((len(rows), 4))
+        features[:, 0] = mileages
+        features[:, 1] = years
+        features[:, 2] = self._encode(makes, self.make_codes)
+        features[:, 3] = self._encode(models, self.model_codes)
+        return features
+
+    def _predict(self, features):
+        return self.model.predict(features)
+
+    def predict_many(self, rows):
+        if self.model is None:
+            raise ValueError("Model not loaded. Load the model before making predictions.")
+
+        if not rows:
+            return []
+
+        return self._predict(self._features(rows)).tolist()
+
+    def predict_price(self, mileage, year, make, model):
+        return self.predict_many([(mileage, year, make, model)])[0]
+
+    def calculate_adjusted_price(self, base_price, mileage, year, make, model):
+        if mileage is None:
+            return base_price
+
+        predicted_price = self.predict_price(mileage, year, make, model)
+        return predicted_price
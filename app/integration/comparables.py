@@ -0,0 +1,201 @@
+import heapq
+import math
+from array import array
+from typing import AbstractSet, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.utils.text import normalize_name
+
+YEAR_WINDOW = 3
+MILEAGE_SCALE = 20000.0
+MODEL_PENALTY = 1.0
+FIELDS = 4
+
+
+class Comparable(NamedTuple):
+    distance: float
+    year: int
+    mileage: int
+    price: float
+    model: str
+
+
+class ComparableTablesBuilder:
+    """
+    Accumulates comparable listings per make as flat runs of ``year,
+    mileage, price, model code``, so that the tables can be built from
+    batches of rows, and from the runs of a previous snapshot for makes
+    that have not changed, without holding a tuple per listing.
+    """
+
+    def __init__(self):
+        self._runs: Dict[str, array] = {}
+        self._model_codes: Dict[str, int] = {}
+        self._model_names: List[str] = []
+
+    def _model_code(self, model: str) -> int:
+        code = self._model_codes.get(model)
+        if code is None:
+            code = self._model_codes[model] = len(self._model_names)
+            self._model_names.append(model)
+        return code
+
+    def _run(self, make: str) -> array:
+        run = self._runs.get(make)
+        if run is None:
+            run = self._runs[make] = array("d")
+        return run
+
+    def add_rows(self, rows: Iterable[Tuple[str, str, int, int, float]]) -> None:
+        """
+        Adds ``(make, model, year, mileage, price)`` rows.
+        """
+        for make, model, year, mileage, price in rows:
+            self._run(normalize_name(make)).extend(
+                (year, mileage, price, self._model_code(normalize_name(model)))
+            )
+
+    def add_tables(self, makes, models, skip_makes: AbstractSet[str]) -> None:
+        """
+        Adds the runs of published ``comparables`` and ``comparable_models``
+        tables, except those of ``skip_makes``.
+
+        :param makes: The published per-make runs.
+        :param models: The published model keys the runs refer to.
+        :param skip_makes: Normalized makes to leave out.
+        """
+        codes = np.full(len(models), -1.0)
+        for index in range(len(makes)):
+            make = makes[index].decode()
+            if make in skip_makes:
+                continue
+
+            fields = np.frombuffer(makes.values(index), dtype=np.float64)
+            fields = fields.reshape(-1, FIELDS).copy()
+            published = fields[:, 3].astype(int)
+            for code in np.unique(published):
+                if codes[code] < 0:
+                    codes[code] = self._model_code(models[int(code)].decode())
+            fields[:, 3] = codes[published]
+            self._run(make).frombytes(fields.tobytes())
+
+    def build(self) -> Tuple[List[bytes], List[array], List[bytes]]:
+        """
+        Sorts each make's run by (year, mileage, price, model) and numbers
+        the models in key order.
+
+        :return: The sorted make keys, one run per make and the sorted model keys.
+        """
+        order = sorted(
+            range(len(self._model_names)), key=self._model_names.__getitem__
+        )
+        model_keys = [self._model_names[code].encode() for code in order]
+        codes = np.empty(len(order))
+        codes[order] = np.arange(len(order))
+
+        make_keys = sorted(make.encode() for make in self._runs)
+        runs = []
+        for make in make_keys:
+            fields = np.frombuffer(self._runs[make.decode()], dtype=np.float64)
+            fields = fields.reshape(-1, FIELDS).copy()
+            fields[:, 3] = codes[fields[:, 3].astype(int)]
+            fields = fields[
+                np.lexsort((fields[:, 3], fields[:, 2], fields[:, 1], fields[:, 0]))
+            ]
+            runs.append(array("d", fields.tobytes()))
+
+        return make_keys, runs, model_keys
+
+
+def _lower_bound(values, lo: int, hi: int, year: float, mileage: float) -> int:
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if (values[mid * FIELDS], values[mid * FIELDS + 1]) < (year, mileage):
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+class ComparableIndex:
+    """
+    Nearest-neighbour search over the per-make (year, mileage) arrays held
+    in the serving snapshot. Used when a segment has no exact matches.
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+
+    def nearest(
+        self,
+        year: int,
+        make: str,
+        model: str,
+        mileage: Optional[int],
+        k: int = 20,
+    ) -> List[Comparable]:
+        """
+        Returns up to ``k`` listings of the same make from neighbouring years,
+        ordered by distance. Distance combines the year gap, the mileage gap
+        in units of ``MILEAGE_SCALE`` and a penalty for a different model.
+        """
+        snapshot = self.manager.current()
+        if snapshot is None or "comparables" not in snapshot.tables:
+            return []
+
+        makes = snapshot.table("comparables")
+        index = makes.find(normalize_name(make).encode())
+        if index < 0:
+            return []
+
+        models = snapshot.table("comparable_models")
+        model_code = models.find(normalize_name(model).encode())
+        values = makes.values(index)
+        count = len(values) // FIELDS
+        candidates = []
+
+        for candidate_year in range(year - YEAR_WINDOW, year + YEAR_WINDOW + 1):
+            start = _lower_bound(values, 0, count, candidate_year, -math.inf)
+            end = _lower_bound(values, start, count, candidate_year, math.inf)
+            if start == end:
+                continue
+
+            if mileage:
+                position = _lower_bound(values, start, end, candidate_year, mileage)
+            else:
+                position = (start + end) // 2
+
+            window = range(max(start, position - 2 * k), min(end, position + 2 * k))
+            for row in window:
+                offset = row * FIELDS
+                mileage_gap = 0.0
+                if mileage:
+                    mileage_gap = (values[offset + 1] - mileage) / MILEAGE_SCALE
+                penalty = 0.0 if values[offset + 3] == model_code else MODEL_PENALTY
+                distance = math.hypot(candidate_year - year, mileage_gap) + penalty
+                candidates.append((distance, row))
+
+        return [
+            Comparable(
+                distance=distance,
+                year=int(values[row * FIELDS]),
+                mileage=int(values[row * FIELDS + 1]),
+                price=values[row * FIELDS + 2],
+                model=models[int(values[row * FIELDS + 3])].decode(),
+            )
+            for distance, row in heapq.nsmallest(k, candidates)
+        ]
+
+
+def weighted_price(comparables: List[Comparable]) -> Optional[float]:
+    """
+    Inverse-distance weighted mean price of the comparables.
+    """
+    if not comparables:
+        return None
+
+    weights = [1.0 / (comparable.distance + 0.1) for comparable in comparables]
+    return sum(
+        weight * comparable.price for weight, comparable in zip(weights, comparables)
+    ) / sum(weights)
@@ -0,0 +1,70 @@
+from typing import Dict, Optional, Type
+
+from app.integration.base_estimator import BaseVehiclePriceEstimator
+from app.integration.gbm_model import GradientBoostingPriceEstimator
+from app.integration.knn_model import KNNPriceEstimator
+from app.integration.lr_model import VehiclePriceEstimator
+from app.integration.serving_snapshot import serving_snapshot
+
+ESTIMATOR_BACKENDS: Dict[str, Type[BaseVehiclePriceEstimator]] = {
+    VehiclePriceEstimator.name: VehiclePriceEstimator,
+    GradientBoostingPriceEstimator.name: GradientBoostingPriceEstimator,
+    KNNPriceEstimator.name: KNNPriceEstimator,
+}
+
+
+def create_estimator(
+    backend: str, model_path: Optional[str] = None
+) -> BaseVehiclePriceEstimator:
+    """
+    Returns an untrained, unloaded estimator for the given backend.
+
+    :param backend: One of the keys of ``ESTIMATOR_BACKENDS``.
+    :param model_path: Overrides the backend's default model path.
+    """
+    try:
+        estimator_class = ESTIMATOR_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(
+            f"Unknown estimator backend {backend!r}. "
+            f"Choose one of {', '.join(ESTIMATOR_BACKENDS)}."
+        )
+
+    if model_path is None:
+        return estimator_class()
+    return estimator_class(model_path=model_path)
+
+
+def model_file(backend: str, model_path: Optional[str] = None) -> Optional[str]:
+    """
+    Returns the file the backend's model is loaded from, or None when it is
+    served from the shared serving snapshot instead.
+    """
+    estimator = create_estimator(backend, model_path)
+    if isinstance(estimator, VehiclePriceEstimator) and model_path is None:
+        snapshot = serving_snapshot.current()
+        if snapshot is not None and "model" in snapshot.metadata:
+            return None
+    return estimator.model_path
+
+
+def load_estimator(
+    backend: str, model_path: Optional[str] = None
+) -> BaseVehiclePriceEstimator:
+    """
+    Returns a loaded estimator. The linear backend is read from the shared
+    serving snapshot when one has been published.
+    """
+    estimator = create_estimator(backend, model_path)
+    snapshot = serving_snapshot.current() if model_path is None else None
+
+    if (
+        isinstance(estimator, VehiclePriceEstimator)
+        and snapshot is not None
+        and "model" in snapshot.metadata
+    ):
+        estimator.load_from_snapshot(snapshot)
+    else:
+        estimator.load_model()
+
+    return estimator
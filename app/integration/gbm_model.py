@@ -0,0 +1,15 @@
+from sklearn.ensemble import HistGradientBoostingRegressor
+
+from app.integration.base_estimator import BaseVehiclePriceEstimator
+
+
+class GradientBoostingPriceEstimator(BaseVehiclePriceEstimator):
+    name = "gbm"
+
+    def __init__(self, model_path="app/gbm_model.joblib"):
+        super().__init__(model_path=model_path)
+
+    def _build_model(self):
+        return HistGradientBoostingRegressor(
+            max_iter=300, learning_rate=0.1, random_state=40
+        )
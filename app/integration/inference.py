@@ -0,0 +1,204 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Hashable, List, Optional, Sequence, Tuple
+
+from app.core.config import config
+from app.integration.base_estimator import BaseVehiclePriceEstimator
+from app.integration.estimators import load_estimator, model_file
+from app.integration.serving_snapshot import serving_snapshot
+
+Row = Tuple[Optional[int], int, str, str]
+
+_process_estimator: Optional[BaseVehiclePriceEstimator] = None
+
+
+def _init_process(backend: str, model_path: Optional[str]) -> None:
+    global _process_estimator
+    _process_estimator = load_estimator(backend, model_path)
+
+
+def _predict_in_process(rows: Sequence[Row]) -> List[float]:
+    return _process_estimator.predict_many(rows)
+
+
+class InferenceExecutor:
+    """
+    Collects concurrent predictions into micro-batches and runs each batch
+    on a worker pool, keeping model inference off the event loop.
+
+    A batch is dispatched once it holds ``max_batch_size`` rows or the
+    oldest row has waited ``max_wait`` seconds, whichever comes first.
+    """
+
+    def __init__(
+        self,
+        backend: str,
+        model_path: Optional[str] = None,
+        max_batch_size: int = 64,
+        max_wait: float = 0.002,
+        pool: str = "thread",
+        workers: int = 1,
+    ):
+        if pool not in ("thread", "process"):
+            raise ValueError("pool must be 'thread' or 'process'.")
+
+        self.backend = backend
+        self.model_path = model_path
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.pool = pool
+        self.workers = workers
+        self.batches = 0
+        self.rows = 0
+        self._estimator: Optional[BaseVehiclePriceEstimator] = None
+        self._executor: Optional[Executor] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._collector: Optional[asyncio.Task] = None
+        self._version: Optional[Hashable] = None
+        self._model_mtime: Optional[int] = None
+        self._model_checked_at = 0.0
+
+    def version(self) -> Hashable:
+        """
+        Identifies what predictions are made from: the serving snapshot
+        generation and, for models loaded from their own file (the gbm and
+        knn backends), that file's modification time. Replacing either
+        changes the version, so results cached or warmed under the old one
+        are not served. The model file is checked at most once per
+        snapshot refresh interval.
+        """
+        snapshot = serving_snapshot.current()
+        now = time.monotonic()
+        if now - self._model_checked_at >= serving_snapshot.refresh_interval:
+            self._model_checked_at = now
+            path = model_file(self.backend, self.model_path)
+            try:
+                self._model_mtime = os.stat(path).st_mtime_ns if path else None
+            except FileNotFoundError:
+                self._model_mtime = None
+
+        return (
+            snapshot.generation if snapshot is not None else None,
+            self._model_mtime,
+        )
+
+    def _load(self) -> None:
+        self._version = self.version()
+        if self.pool == "process":
+            previous = self._executor
+            # Spawned rather than forked: the server runs threads (logging,
+            # the inference collector) whose locks a forked child could
+            # inherit held.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_process,
+                initargs=(self.backend, self.model_path),
+            )
+            if previous is not None:
+                previous.shutdown(wait=False)
+        else:
+            self._estimator = load_estimator(self.backend, self.model_path)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="inference"
+                )
+
+    def _start(self) -> None:
+        self._load()
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.workers)
+        self._collector = asyncio.ensure_future(self._collect())
+
+    async def predict(self, row: Row) -> float:
+        """
+        Predicts the price for one ``(mileage, year, make, model)`` row.
+
+        The model is reloaded when the serving version has changed since
+        it was loaded: a new snapshot was published or the model file was
+        replaced.
+        """
+        if self._collector is None:
+            self._start()
+        elif self.version() != self._version:
+            self._load()
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, future))
+        return await future
+
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._slots.acquire()
+            asyncio.ensure_future(self._dispatch(batch))
+
+    async def _dispatch(self, batch) -> None:
+        rows = [row for row, _ in batch]
+        loop = asyncio.get_running_loop()
+
+        try:
+            if self.pool == "process":
+                predictions = await loop.run_in_executor(
+                    self._executor, _predict_in_process, rows
+                )
+            else:
+                predictions = await loop.run_in_executor(
+                    self._executor, self._estimator.predict_many, rows
+                )
+        except Exception as exception:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exception)
+            return
+        finally:
+            self._slots.release()
+
+        self.batches += 1
+        self.rows += len(rows)
+        for (_, future), prediction in zip(batch, predictions):
+            if not future.done():
+                future.set_result(prediction)
+
+    async def close(self) -> None:
+        if self._collector is not None:
+            self._collector.cancel()
+            self._collector = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend,
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch_size": self.rows / self.batches if self.batches else 0.0,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+        }
+
+
+inference_executor = InferenceExecutor(
+    backend=config.ESTIMATOR_BACKEND,
+    max_batch_size=config.INFERENCE_MAX_BATCH_SIZE,
+    max_wait=config.INFERENCE_MAX_WAIT_MS / 1000,
+    pool=config.INFERENCE_POOL,
+    workers=config.INFERENCE_WORKERS,
+)
@@ -0,0 +1,494 @@
+import argparse
+import asyncio
+import io
+import multiprocessing
+import os
+from collections import deque
+from contextlib import aclosing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+from uuid import uuid4
+
+import pandas as pd
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import config
+from app.core.database.session import (
+    reset_session_context,
+    session,
+    set_session_context,
+)
+from app.integration.comparables import ComparableTablesBuilder
+from app.integration.quantile_sketch import SegmentQuantileStore
+from app.integration.serving_snapshot import serving_snapshot
+from app.models.estimate import UNKNOWN_YEAR, Vehicle
+from app.models.location import ZipCentroid
+from app.models.partitioning import vehicle_partitioning
+from app.repositories import VehicleRepository, ZipCentroidRepository
+from app.repositories.filters import DELISTED_STATUS
+from app.utils.file_lock import file_lock
+from app.utils.logger import ProgressLogger, app_logger
+from app.utils.text import normalize_name
+
+# Held by whichever process loads or diffs a snapshot, so server workers
+# starting together and the delta command never ingest at the same time.
+INGEST_LOCK_PATH = os.path.join(config.SERVING_SNAPSHOT_DIR, "ingest.lock")
+
+DATE_COLUMNS = ("first_seen_date", "last_seen_date", "dealer_vdp_last_seen_date")
+# Advance with every snapshot, so they are not treated as changes.
+SEEN_DATE_COLUMNS = ("last_seen_date", "dealer_vdp_last_seen_date")
+VEHICLE_COLUMNS = {column.key for column in Vehicle.__table__.columns} - {
+    "id",
+    "created_at",
+}
+
+
+def _records(chunk: pd.DataFrame) -> List[dict]:
+    """
+    Converts parsed snapshot rows to dictionaries, with the date columns
+    parsed, a missing year set to ``UNKNOWN_YEAR`` and other missing values
+    replaced by None.
+    """
+    if "year" in chunk:
+        chunk["year"] = chunk["year"].fillna(UNKNOWN_YEAR).astype(int)
+
+    if "dealer_zip" in chunk:
+        chunk["dealer_zip"] = chunk["dealer_zip"].str.strip().str[:5]
+
+    for column in DATE_COLUMNS:
+        if column in chunk:
+            chunk[column] = pd.to_datetime(chunk[column], errors="coerce").dt.date
+
+    df_filtered = chunk.astype(object).where(chunk.notna(), None)
+    return df_filtered.to_dict(orient="records")
+
+
+def snapshot_ranges(
+    data_file_path: str, chunk_bytes: int
+) -> Tuple[List[str], List[Tuple[int, int]]]:
+    """
+    Splits a snapshot file into byte ranges of about ``chunk_bytes`` that
+    start and end on line boundaries, so that they can be parsed
+    independently. Assumes one record per line.
+
+    :return: The column names from the header and the ``(start, end)`` ranges.
+    """
+    with open(data_file_path, "rb") as data_file:
+        header = data_file.readline().decode().rstrip("\r\n").split("|")
+        size = os.fstat(data_file.fileno()).st_size
+        ranges = []
+        start = data_file.tell()
+
+        while start < size:
+            data_file.seek(min(start + chunk_bytes, size))
+            data_file.readline()
+            end = min(data_file.tell(), size)
+            ranges.append((start, end))
+            start = end
+
+    return [column.strip() for column in header], ranges
+
+
+def parse_range(
+    data_file_path: str, header: List[str], start: int, end: int
+) -> List[dict]:
+    """
+    Parses one byte range of a snapshot into row dictionaries. Runs in an
+    ingest worker process.
+    """
+    with open(data_file_path, "rb") as data_file:
+        data_file.seek(start)
+        data = data_file.read(end - start)
+
+    chunk = pd.read_csv(
+        io.BytesIO(data),
+        delimiter="|",
+        header=None,
+        names=header,
+        on_bad_lines="skip",
+        dtype={"dealer_zip": str},
+    )
+    return _records(chunk)
+
+
+def parse_range_by_partition(
+    data_file_path: str, header: List[str], start: int, end: int
+) -> Dict[str, List[dict]]:
+    """
+    Parses one byte range of a snapshot for a full load, with the rows
+    grouped by partition.
+    """
+    return vehicle_partitioning.group(
+        parse_range(data_file_path, header, start, end)
+    )
+
+
+async def parse_snapshot(
+    data_file_path: str,
+    parse: Callable = parse_range,
+    workers: int = config.INGEST_PARSE_WORKERS,
+    chunk_bytes: int = config.INGEST_PARSE_CHUNK_BYTES,
+) -> AsyncIterator:
+    """
+    Parses a snapshot on a process pool and yields the result of ``parse``
+    for each byte range, in file order. At most two ranges per worker are
+    in flight, so parsing stays only a little ahead of a slow consumer.
+
+    :param data_file_path: Path to the pipe-delimited snapshot file.
+    :param parse: A picklable ``(path, header, start, end)`` function.
+    :param workers: Number of parser processes.
+    :param chunk_bytes: Approximate size of each byte range.
+    """
+    loop = asyncio.get_running_loop()
+    header, ranges = snapshot_ranges(data_file_path, chunk_bytes)
+    # Spawned rather than forked: the server runs threads (logging,
+    # inference) whose locks a forked child could inherit held.
+    executor = ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    )
+    pending: deque = deque()
+
+    try:
+        for start, end in ranges:
+            pending.append(
+                loop.run_in_executor(
+                    executor, parse, data_file_path, header, start, end
+                )
+            )
+            if len(pending) >= 2 * workers:
+                yield await pending.popleft()
+
+        while pending:
+            yield await pending.popleft()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def _batched(
+    chunks: AsyncIterator[List[dict]], batch_size: int
+) -> AsyncIterator[List[dict]]:
+    async for records in chunks:
+        for start in range(0, len(records), batch_size):
+            yield records[start : start + batch_size]
+
+
+async def run_ingest_pipeline(
+    data_file_path: str,
+    write: Callable[[str, List[dict]], Awaitable[None]],
+    writers: int = config.INGEST_PARTITION_WRITERS,
+    workers: int = config.INGEST_PARSE_WORKERS,
+    chunk_bytes: int = config.INGEST_PARSE_CHUNK_BYTES,
+    queue_size: int = config.INGEST_QUEUE_SIZE,
+) -> None:
+    """
+    Loads a snapshot through a pipeline: worker processes parse byte
+    ranges into per-partition batches, a bounded queue holds them, and
+    ``writers`` concurrent ``write(partition, records)`` calls drain it.
+    When the writers fall behind the queue fills up and parsing pauses.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    async def writer() -> None:
+        error = None
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            if error is not None:
+                # Keep draining so the parser never blocks on a full queue.
+                continue
+            try:
+                await write(*item)
+            except Exception as exception:
+                error = exception
+        if error is not None:
+            raise error
+
+    tasks = [asyncio.ensure_future(writer()) for _ in range(writers)]
+    try:
+        async with aclosing(
+            parse_snapshot(
+                data_file_path, parse_range_by_partition, workers, chunk_bytes
+            )
+        ) as chunks:
+            async for partitions in chunks:
+                for item in partitions.items():
+                    await queue.put(item)
+    finally:
+        for _ in tasks:
+            await queue.put(None)
+        await asyncio.gather(*tasks)
+
+
+async def populate_snapshot(db_session: AsyncSession, data_file_path: str) -> None:
+    """
+    Loads a full snapshot into an empty vehicles table, with parsing on
+    ``INGEST_PARSE_WORKERS`` processes and ``INGEST_PARTITION_WRITERS``
+    concurrent writers, each on its own session. SQLite allows a single
+    writer, so emulated partitions load one batch at a time.
+    """
+    progress = ProgressLogger(
+        app_logger, "Snapshot load", config.INGEST_PROGRESS_INTERVAL_SECONDS
+    )
+
+    async def write(partition: str, records: List[dict]) -> None:
+        await _load_partition(partition, records)
+        progress.add(rows=len(records), batches=1)
+
+    await run_ingest_pipeline(
+        data_file_path,
+        write,
+        writers=1 if vehicle_partitioning.emulated else config.INGEST_PARTITION_WRITERS,
+    )
+    progress.done()
+
+    await publish_serving_data(db_session)
+
+
+async def _load_partition(partition: str, records: List[dict]) -> None:
+    context = set_session_context(session_id=str(uuid4()))
+    try:
+        vehicle_repo = VehicleRepository(model=Vehicle, db_session=session)
+        await vehicle_repo.insert_partition(partition, records)
+        await session.commit()
+    finally:
+        await session.remove()
+        reset_session_context(context=context)
+
+
+async def populate_zip_centroids(
+    db_session: AsyncSession, zip_file_path: str, chunksize: int = 5000
+) -> None:
+    """
+    Loads ZIP code centroids from a Census ZCTA gazetteer file
+    (tab-separated, with GEOID, INTPTLAT and INTPTLONG columns).
+    """
+    if not os.path.exists(zip_file_path):
+        app_logger.warning(
+            f"ZIP centroid file not found at {zip_file_path}. "
+            "Radius searches are unavailable."
+        )
+        return
+
+    zip_repo = ZipCentroidRepository(model=ZipCentroid, db_session=db_session)
+
+    for chunk in pd.read_csv(
+        zip_file_path, sep="\t", dtype={"GEOID": str}, chunksize=chunksize
+    ):
+        chunk.columns = [column.strip() for column in chunk.columns]
+        centroids = chunk.rename(
+            columns={
+                "GEOID": "zip_code",
+                "INTPTLAT": "latitude",
+                "INTPTLONG": "longitude",
+            }
+        )[["zip_code", "latitude", "longitude"]]
+        await zip_repo.insert_many(centroids.to_dict(orient="records"))
+
+    await db_session.commit()
+    app_logger.info("ZIP centroids populated.")
+
+
+def _add_price_rows(
+    store: SegmentQuantileStore,
+    comparables: ComparableTablesBuilder,
+    price_rows: List[Tuple[str, str, int, Optional[int], float]],
+) -> None:
+    store.add_rows(price_rows)
+    comparables.add_rows(row for row in price_rows if row[3] is not None)
+
+
+async def publish_serving_data(
+    db_session: AsyncSession, changed_makes: Optional[Set[str]] = None
+) -> None:
+    """
+    Publishes the price sketches, with the regression model and the
+    comparable listings, as a new shared serving snapshot.
+
+    Only the active listings of ``changed_makes`` are read back: their
+    sketches and comparables are rebuilt, and every other make's are
+    copied from the current snapshot. Rebuilding a make rather than adding
+    the delta to its sketches drops delisted listings and superseded
+    prices, which a sketch cannot remove. Without ``changed_makes`` or a
+    current snapshot, every make is rebuilt.
+
+    :param db_session: The database session.
+    :param changed_makes: Makes with inserted, updated or delisted listings.
+    """
+    loop = asyncio.get_running_loop()
+    snapshot = serving_snapshot.current() if changed_makes is not None else None
+    makes = None
+    store = SegmentQuantileStore()
+    comparables = ComparableTablesBuilder()
+
+    if snapshot is not None:
+        makes = {normalize_name(make) for make in changed_makes if make}
+        store = await loop.run_in_executor(None, snapshot.quantile_store, makes)
+        comparables = await loop.run_in_executor(
+            None, snapshot.comparable_tables, makes
+        )
+
+    vehicle_repo = VehicleRepository(model=Vehicle, db_session=db_session)
+    if makes is None or makes:
+        async for price_rows in vehicle_repo.iter_price_rows(makes=makes):
+            # Sketching is CPU work; keep it off the event loop.
+            await loop.run_in_executor(
+                None, _add_price_rows, store, comparables, price_rows
+            )
+
+    generation = await loop.run_in_executor(
+        None, partial(serving_snapshot.publish, store, comparables=comparables)
+    )
+    app_logger.info(f"Published serving snapshot generation {generation}.")
+
+
+def _changed(vehicle: Vehicle, record: dict) -> bool:
+    return any(
+        getattr(vehicle, key) != value
+        for key, value in record.items()
+        if key in VEHICLE_COLUMNS and key not in SEEN_DATE_COLUMNS
+    )
+
+
+def _seen_dates(row) -> Tuple:
+    if isinstance(row, dict):
+        return tuple(row.get(column) for column in SEEN_DATE_COLUMNS)
+    return tuple(getattr(row, column) for column in SEEN_DATE_COLUMNS)
+
+
+async def apply_delta(
+    db_session: AsyncSession, data_file_path: str, batch_size: int = 1000
+) -> Dict[str, int]:
+    """
+    Diffs a snapshot against the stored vehicles by VIN and applies the
+    inserts, updates and delistings in batches. Unchanged rows are not
+    written, except to advance their seen dates with one statement per
+    batch and date. A listing whose model year changed is moved to the
+    partition of its new year, and a delisted VIN that reappears is
+    listed again.
+
+    :param db_session: The database session.
+    :param data_file_path: Path to the pipe-delimited snapshot file.
+    :param batch_size: Number of snapshot rows per batch.
+    :return: Counts of inserted, updated, unchanged and delisted vehicles.
+    """
+    vehicle_repo = VehicleRepository(model=Vehicle, db_session=db_session)
+    active_vins = await vehicle_repo.get_active_vins()
+    seen_vins: Set[str] = set()
+    changed_makes: Set[str] = set()
+    stats = {"inserted": 0, "updated": 0, "unchanged": 0, "delisted": 0}
+    progress = ProgressLogger(
+        app_logger, "Snapshot delta", config.INGEST_PROGRESS_INTERVAL_SECONDS
+    )
+
+    async for records in _batched(parse_snapshot(data_file_path), batch_size):
+        by_vin: Dict[str, dict] = {}
+        for record in records:
+            vin = record.get("vin")
+            if vin and vin not in seen_vins:
+                by_vin[vin] = record
+        seen_vins.update(by_vin)
+
+        # Across every partition: the snapshot's year may not be the stored one.
+        existing = await vehicle_repo.get_by_vins(list(by_vin))
+
+        inserts: List[dict] = []
+        updates: List[dict] = []
+        moves: List[Tuple[Vehicle, dict]] = []
+        seen: Dict[Tuple, List[Vehicle]] = {}
+        for vin, record in by_vin.items():
+            vehicle = existing.get(vin)
+            if vehicle is None:
+                inserts.append(record)
+                changed_makes.add(record.get("make"))
+            elif vehicle.year != record["year"]:
+                moves.append((vehicle, record))
+                changed_makes.update((vehicle.make, record.get("make")))
+            elif _changed(vehicle, record) or vehicle.listing_status == DELISTED_STATUS:
+                updates.append(
+                    {
+                        **record,
+                        # The snapshot's status, if any, replaces a delisting.
+                        "listing_status": record.get("listing_status"),
+                        "id": vehicle.id,
+                        "year": vehicle.year,
+                    }
+                )
+                changed_makes.update((vehicle.make, record.get("make")))
+            else:
+                dates = _seen_dates(record)
+                if dates != _seen_dates(vehicle):
+                    seen.setdefault(dates, []).append(vehicle)
+                stats["unchanged"] += 1
+
+        db_session.expunge_all()
+        if moves:
+            # The year is part of the key and picks the partition, so the
+            # row is replaced rather than updated.
+            await vehicle_repo.delete_many(
+                [{"id": vehicle.id, "year": vehicle.year} for vehicle, _ in moves]
+            )
+        if inserts or moves:
+            await vehicle_repo.insert_many(
+                inserts + [record for _, record in moves]
+            )
+        if updates:
+            await vehicle_repo.update_many(updates)
+        for dates, vehicles in seen.items():
+            await vehicle_repo.update_by_vins(
+                [vehicle.vin for vehicle in vehicles],
+                dict(zip(SEEN_DATE_COLUMNS, dates)),
+                years={vehicle.year for vehicle in vehicles},
+            )
+        await db_session.commit()
+
+        stats["inserted"] += len(inserts)
+        stats["updated"] += len(updates) + len(moves)
+        progress.add(rows=len(records))
+
+    delisted = list(active_vins - seen_vins)
+    for start in range(0, len(delisted), batch_size):
+        batch = delisted[start : start + batch_size]
+        vehicles = await vehicle_repo.get_by_vins(batch)
+        changed_makes.update(vehicle.make for vehicle in vehicles.values())
+        db_session.expunge_all()
+        await vehicle_repo.mark_delisted(batch)
+        await db_session.commit()
+    stats["delisted"] = len(delisted)
+
+    await publish_serving_data(db_session, changed_makes)
+    app_logger.info(
+        f"Applied snapshot delta from {data_file_path}: {stats}", extra=stats
+    )
+    return stats
+
+
+async def run_delta(data_file_path: str, batch_size: int) -> Dict[str, int]:
+    async with file_lock(INGEST_LOCK_PATH):
+        context = set_session_context(session_id=str(uuid4()))
+        try:
+            return await apply_delta(session, data_file_path, batch_size)
+        finally:
+            await session.remove()
+            reset_session_context(context=context)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Apply a daily inventory snapshot as a delta."
+    )
+    parser.add_argument("data_file_path", nargs="?", default=config.DATA_FILE_PATH)
+    parser.add_argument("--batch-size", type=int, default=config.INGEST_BATCH_SIZE)
+    args = parser.parse_args()
+
+    asyncio.run(run_delta(args.data_file_path, args.batch_size))
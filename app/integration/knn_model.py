@@ -0,0 +1,19 @@
+from sklearn.neighbors import KNeighborsRegressor
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from app.integration.base_estimator import BaseVehiclePriceEstimator
+
+
+class KNNPriceEstimator(BaseVehiclePriceEstimator):
+    name = "knn"
+
+    def __init__(self, model_path="app/knn_model.joblib", n_neighbors=15):
+        super().__init__(model_path=model_path)
+        self.n_neighbors = n_neighbors
+
+    def _build_model(self):
+        return make_pipeline(
+            StandardScaler(),
+            KNeighborsRegressor(n_neighbors=self.n_neighbors, weights="distance"),
+        )
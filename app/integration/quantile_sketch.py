@@ -0,0 +1,269 @@
+import math
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from app.utils.text import normalize_name
+
+MILEAGE_BUCKET_SIZE = 10000
+UNKNOWN_MILEAGE_BUCKET = "none"
+
+
+def bucket_in_range(
+    bucket: str, max_mileage: Optional[int], bucket_size: int
+) -> bool:
+    """
+    Whether a mileage bucket can hold listings at or below ``max_mileage``.
+
+    :param max_mileage: Mileage cap, ``None`` or ``0`` for no cap.
+    """
+    if not max_mileage:
+        return True
+    if bucket == UNKNOWN_MILEAGE_BUCKET:
+        return False
+    return int(bucket) * bucket_size <= max_mileage
+
+
+class KLLSketch:
+    """
+    Mergeable quantile sketch (KLL) with deterministic compaction.
+
+    Items at compactor level ``h`` carry a weight of ``2 ** h``, so the
+    total weight always equals the number of inserted values.
+    """
+
+    def __init__(self, k: int = 200, c: float = 2.0 / 3.0):
+        self.k = k
+        self.c = c
+        self.compactors: List[List[float]] = [[]]
+        self.offsets: List[int] = [0]
+        self.count = 0
+        self.size = 0
+        self.max_size = 0
+        self._update_max_size()
+
+    def _capacity(self, height: int) -> int:
+        depth = len(self.compactors) - height - 1
+        return int(math.ceil(self.k * self.c**depth)) + 1
+
+    def _update_max_size(self) -> None:
+        self.max_size = sum(
+            self._capacity(height) for height in range(len(self.compactors))
+        )
+
+    def _grow(self) -> None:
+        self.compactors.append([])
+        self.offsets.append(0)
+        self._update_max_size()
+
+    def _compact_once(self) -> None:
+        for height in range(len(self.compactors)):
+            if len(self.compactors[height]) < self._capacity(height):
+                continue
+
+            if height + 1 >= len(self.compactors):
+                self._grow()
+
+            before = len(self.compactors[height])
+            items = sorted(self.compactors[height])
+            leftover = [items.pop()] if len(items) % 2 else []
+            offset = self.offsets[height]
+            self.offsets[height] ^= 1
+
+            promoted = items[offset::2]
+            self.compactors[height] = leftover
+            self.compactors[height + 1].extend(promoted)
+            self.size += len(promoted) + len(leftover) - before
+            return
+
+    def _compress(self) -> None:
+        while self.size >= self.max_size:
+            self._compact_once()
+
+    def update(self, value: float) -> None:
+        self.compactors[0].append(float(value))
+        self.count += 1
+        self.size += 1
+        self._compress()
+
+    def update_many(self, values: Iterable[float]) -> None:
+        for value in values:
+            self.update(value)
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        """
+        Merge another sketch into this one in place.
+
+        :param other: The sketch to merge.
+        :return: This sketch.
+        """
+        while len(self.compactors) < len(other.compactors):
+            self._grow()
+
+        for height, items in enumerate(other.compactors):
+            self.compactors[height].extend(items)
+
+        self.count += other.count
+        self.size = sum(len(items) for items in self.compactors)
+        self._compress()
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Returns the approximate value at the given quantile.
+
+        :param q: The quantile in the range [0, 1].
+        :return: The approximate value, or None if the sketch is empty.
+        """
+        if not 0.0 <= q <= 1.0:
+            raise ValueError("Quantile must be between 0 and 1.")
+
+        weighted = sorted(self.weighted_items())
+        if not weighted:
+            return None
+
+        target = q * self.count
+        cumulative = 0
+        for value, weight in weighted:
+            cumulative += weight
+            if cumulative >= target:
+                return value
+
+        return weighted[-1][0]
+
+    def weighted_items(self) -> Iterator[Tuple[float, int]]:
+        for height, items in enumerate(self.compactors):
+            for value in items:
+                yield value, 1 << height
+
+    def quantiles(self, qs: Sequence[float]) -> List[Optional[float]]:
+        return [self.quantile(q) for q in qs]
+
+    def to_dict(self) -> dict:
+        return {
+            "k": self.k,
+            "c": self.c,
+            "count": self.count,
+            "compactors": self.compactors,
+            "offsets": self.offsets,
+        }
+
+    @classmethod
+    def from_weighted(
+        cls, items: Iterable[Tuple[float, int]], k: int = 200
+    ) -> "KLLSketch":
+        """
+        Rebuilds a sketch from ``(value, weight)`` pairs, as produced by
+        :meth:`weighted_items`.
+        """
+        sketch = cls(k=k)
+        for value, weight in items:
+            height = int(weight).bit_length() - 1
+            while len(sketch.compactors) <= height:
+                sketch.compactors.append([])
+                sketch.offsets.append(0)
+            sketch.compactors[height].append(float(value))
+            sketch.count += int(weight)
+        sketch.size = sum(len(items) for items in sketch.compactors)
+        sketch._update_max_size()
+        return sketch
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "KLLSketch":
+        sketch = cls(k=data["k"], c=data["c"])
+        sketch.compactors = [list(items) for items in data["compactors"]]
+        sketch.offsets = list(data["offsets"])
+        sketch.count = data["count"]
+        sketch.size = sum(len(items) for items in sketch.compactors)
+        sketch._update_max_size()
+        return sketch
+
+
+class SegmentQuantileStore:
+    """
+    Per (year, make, model) price sketches, split into mileage buckets so
+    that a mileage-capped estimate only merges the buckets it needs.
+    """
+
+    def __init__(self, k: int = 200, bucket_size: int = MILEAGE_BUCKET_SIZE):
+        self.k = k
+        self.bucket_size = bucket_size
+        self.segments: Dict[str, Dict[str, KLLSketch]] = {}
+
+    @staticmethod
+    def segment_key(year: int, make: str, model: str) -> str:
+        return f"{year}|{normalize_name(make)}|{normalize_name(model)}"
+
+    @staticmethod
+    def segment_make(segment_key: str) -> str:
+        return segment_key.split("|", 2)[1]
+
+    def _bucket(self, mileage: Optional[int]) -> str:
+        if mileage is None:
+            return UNKNOWN_MILEAGE_BUCKET
+        return str(int(mileage) // self.bucket_size)
+
+    def add(
+        self, year: int, make: str, model: str, mileage: Optional[int], price: float
+    ) -> None:
+        buckets = self.segments.setdefault(self.segment_key(year, make, model), {})
+        bucket = self._bucket(mileage)
+        if bucket not in buckets:
+            buckets[bucket] = KLLSketch(k=self.k)
+        buckets[bucket].update(price)
+
+    def add_records(self, records: Iterable[dict]) -> None:
+        for record in records:
+            if record.get("listing_price") is None or not record.get("year"):
+                continue
+            self.add(
+                year=record["year"],
+                make=record.get("make"),
+                model=record.get("model"),
+                mileage=record.get("listing_mileage"),
+                price=record["listing_price"],
+            )
+
+    def add_rows(
+        self, rows: Iterable[Tuple[str, str, int, Optional[int], float]]
+    ) -> None:
+        """
+        Adds ``(make, model, year, mileage, price)`` rows.
+        """
+        for make, model, year, mileage, price in rows:
+            self.add(year, make, model, mileage, price)
+
+    def merge(self, other: "SegmentQuantileStore") -> "SegmentQuantileStore":
+        """
+        Merge the sketches of another store (e.g. another shard) into this one.
+
+        :param other: The store to merge.
+        :return: This store.
+        """
+        for key, other_buckets in other.segments.items():
+            buckets = self.segments.setdefault(key, {})
+            for bucket, sketch in other_buckets.items():
+                if bucket in buckets:
+                    buckets[bucket].merge(sketch)
+                else:
+                    buckets[bucket] = KLLSketch.from_dict(sketch.to_dict())
+        return self
+
+    def get_sketch(
+        self, year: int, make: str, model: str, max_mileage: Optional[int] = None
+    ) -> Optional[KLLSketch]:
+        """
+        Returns a merged sketch for the segment, limited to the mileage
+        buckets that can hold listings at or below ``max_mileage``.
+
+        :param max_mileage: Mileage cap, ``None`` or ``0`` for no cap.
+        :return: The merged sketch, or None if the segment is unknown.
+        """
+        buckets = self.segments.get(self.segment_key(year, make, model))
+        if not buckets:
+            return None
+
+        merged = KLLSketch(k=self.k)
+        for bucket, sketch in buckets.items():
+            if bucket_in_range(bucket, max_mileage, self.bucket_size):
+                merged.merge(sketch)
+
+        return merged if merged.count else None
@@ -0,0 +1,405 @@
+import bisect
+import json
+import mmap
+import os
+import struct
+import time
+from array import array
+from typing import AbstractSet, Dict, Iterator, Optional, Sequence, Tuple
+
+from app.core.config import config
+from app.integration.comparables import ComparableIndex, ComparableTablesBuilder
+from app.integration.quantile_sketch import (
+    KLLSketch,
+    SegmentQuantileStore,
+    bucket_in_range,
+)
+
+MAGIC = b"CVSNAP01"
+PREAMBLE = struct.Struct("<8sQQ")
+CURRENT_FILE = "CURRENT"
+KEY_SEPARATOR = b"\x00"
+KEEP_GENERATIONS = 2
+
+
+def _align(offset: int, alignment: int = 8) -> int:
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def _sketch_key(segment_key: str, bucket: str) -> bytes:
+    return segment_key.encode() + KEY_SEPARATOR + bucket.encode()
+
+
+def _pairs(values: memoryview) -> Iterator[Tuple[float, int]]:
+    for index in range(0, len(values), 2):
+        yield values[index], int(values[index + 1])
+
+
+class SnapshotTable:
+    """
+    Read-only sorted string table backed by the snapshot mapping, with an
+    optional run of float64 values per key.
+
+    Supports ``len()`` and indexing, so :mod:`bisect` can search it without
+    copying the keys into the worker.
+    """
+
+    def __init__(self, view: memoryview, meta: dict, base: int):
+        self._count = meta["count"]
+        self._key_offsets = self._slice(view, base, meta, "key_offsets", "Q")
+        self._keys = view[base + meta["keys"] : base + meta["keys_end"]]
+        self._value_offsets = None
+        self._values = None
+        if "values" in meta:
+            self._value_offsets = self._slice(
+                view, base, meta, "value_offsets", "Q"
+            )
+            self._values = self._slice(view, base, meta, "values", "d")
+
+    @staticmethod
+    def _slice(view: memoryview, base: int, meta: dict, name: str, fmt: str):
+        return view[base + meta[name] : base + meta[name + "_end"]].cast(fmt)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> bytes:
+        start, end = self._key_offsets[index], self._key_offsets[index + 1]
+        return bytes(self._keys[start:end])
+
+    def find(self, key: bytes) -> int:
+        """
+        Returns the position of the key, or -1 if it is not in the table.
+        """
+        index = bisect.bisect_left(self, key)
+        if index < self._count and self[index] == key:
+            return index
+        return -1
+
+    def prefix_range(self, prefix: bytes) -> range:
+        lo = bisect.bisect_left(self, prefix)
+        hi = bisect.bisect_left(self, prefix[:-1] + bytes([prefix[-1] + 1]))
+        return range(lo, hi)
+
+    def values(self, index: int) -> memoryview:
+        start, end = self._value_offsets[index], self._value_offsets[index + 1]
+        return self._values[start:end]
+
+
+class ServingSnapshot:
+    """
+    A read-only memory mapping of one snapshot generation. The operating
+    system shares the mapped pages between every worker that attaches it.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as snapshot_file:
+            self._mmap = mmap.mmap(
+                snapshot_file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+
+        magic, self.generation, header_len = PREAMBLE.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a serving snapshot.")
+
+        self.metadata = json.loads(
+            self._mmap[PREAMBLE.size : PREAMBLE.size + header_len]
+        )
+        base = _align(PREAMBLE.size + header_len)
+        view = memoryview(self._mmap)
+        self.tables: Dict[str, SnapshotTable] = {
+            name: SnapshotTable(view, meta, base)
+            for name, meta in self.metadata["tables"].items()
+        }
+
+    def table(self, name: str) -> SnapshotTable:
+        return self.tables[name]
+
+    def quantile_store(
+        self, skip_makes: AbstractSet[str] = frozenset()
+    ) -> SegmentQuantileStore:
+        """
+        Copies the published sketches into a store, except those of the
+        segments of ``skip_makes``.
+
+        :param skip_makes: Normalized makes to leave out.
+        """
+        k = self.metadata["k"]
+        store = SegmentQuantileStore(k=k, bucket_size=self.metadata["bucket_size"])
+        table = self.table("sketches")
+
+        for index in range(len(table)):
+            segment_key, bucket = table[index].split(KEY_SEPARATOR, 1)
+            segment_key = segment_key.decode()
+            if SegmentQuantileStore.segment_make(segment_key) in skip_makes:
+                continue
+            store.segments.setdefault(segment_key, {})[
+                bucket.decode()
+            ] = KLLSketch.from_weighted(_pairs(table.values(index)), k=k)
+
+        return store
+
+    def comparable_tables(
+        self, skip_makes: AbstractSet[str] = frozenset()
+    ) -> ComparableTablesBuilder:
+        """
+        Copies the published comparable listings into a builder, except
+        those of ``skip_makes``.
+
+        :param skip_makes: Normalized makes to leave out.
+        """
+        builder = ComparableTablesBuilder()
+        if "comparables" in self.tables:
+            builder.add_tables(
+                self.table("comparables"),
+                self.table("comparable_models"),
+                skip_makes,
+            )
+        return builder
+
+
+class SnapshotBuilder:
+    def __init__(self):
+        self.body = bytearray()
+        self.tables: Dict[str, dict] = {}
+
+    def _append(self, data: bytes) -> Tuple[int, int]:
+        self.body.extend(b"\x00" * (_align(len(self.body)) - len(self.body)))
+        start = len(self.body)
+        self.body.extend(data)
+        return start, len(self.body)
+
+    def add_table(
+        self,
+        name: str,
+        keys: Sequence[bytes],
+        values: Optional[Sequence[Sequence[float]]] = None,
+    ) -> None:
+        """
+        Adds a table. ``keys`` must already be sorted.
+
+        :param name: The table name.
+        :param keys: The sorted keys.
+        :param values: An optional run of floats for each key.
+        """
+        key_offsets = array("Q", [0])
+        for key in keys:
+            key_offsets.append(key_offsets[-1] + len(key))
+
+        meta = {"count": len(keys)}
+        meta["key_offsets"], meta["key_offsets_end"] = self._append(
+            key_offsets.tobytes()
+        )
+        meta["keys"], meta["keys_end"] = self._append(b"".join(keys))
+
+        if values is not None:
+            value_offsets = array("Q", [0])
+            flat = array("d")
+            for run in values:
+                flat.extend(run)
+                value_offsets.append(len(flat))
+            meta["value_offsets"], meta["value_offsets_end"] = self._append(
+                value_offsets.tobytes()
+            )
+            meta["values"], meta["values_end"] = self._append(flat.tobytes())
+
+        self.tables[name] = meta
+
+    def write(self, path: str, generation: int, metadata: dict) -> None:
+        header = json.dumps({**metadata, "tables": self.tables}).encode()
+        preamble = PREAMBLE.pack(MAGIC, generation, len(header))
+        padding = _align(len(preamble) + len(header)) - len(preamble) - len(header)
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as snapshot_file:
+            snapshot_file.write(preamble)
+            snapshot_file.write(header)
+            snapshot_file.write(b"\x00" * padding)
+            snapshot_file.write(self.body)
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(tmp_path, path)
+
+
+class ServingSnapshotManager:
+    """
+    Publishes serving snapshots as numbered generations and keeps each
+    worker attached to the newest one.
+
+    A new generation is written to its own file and only then made current
+    by atomically replacing the ``CURRENT`` pointer, so readers never see a
+    partially written snapshot.
+    """
+
+    def __init__(self, directory: str, refresh_interval: float = 1.0):
+        self.directory = directory
+        self.refresh_interval = refresh_interval
+        self._snapshot: Optional[ServingSnapshot] = None
+        self._checked_at = 0.0
+
+    def _path(self, generation: int) -> str:
+        return os.path.join(self.directory, f"snapshot-{generation:08d}.bin")
+
+    def _current_generation(self) -> Optional[int]:
+        try:
+            with open(os.path.join(self.directory, CURRENT_FILE), "r") as current:
+                return int(current.read().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def current(self) -> Optional[ServingSnapshot]:
+        """
+        Returns the attached snapshot, re-attaching if a newer generation
+        has been published since the last check.
+        """
+        now = time.monotonic()
+        if (
+            self._snapshot is not None
+            and now - self._checked_at < self.refresh_interval
+        ):
+            return self._snapshot
+        self._checked_at = now
+
+        generation = self._current_generation()
+        if generation is None:
+            return self._snapshot
+        if self._snapshot is None or self._snapshot.generation != generation:
+            self._snapshot = ServingSnapshot(self._path(generation))
+
+        return self._snapshot
+
+    def publish(
+        self,
+        store: SegmentQuantileStore,
+        model_path: str = "app/regression_model.json",
+        comparables: Optional[ComparableTablesBuilder] = None,
+    ) -> int:
+        """
+        Writes the sketches, regression model and comparable listings as a
+        new generation.
+
+        :param store: The quantile store to publish.
+        :param model_path: Path to the saved regression model.
+        :param comparables: The listings for the nearest-comparable fallback.
+        :return: The published generation number.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        builder = SnapshotBuilder()
+        metadata = {"k": store.k, "bucket_size": store.bucket_size}
+
+        sketches = sorted(
+            (_sketch_key(segment_key, bucket), sketch)
+            for segment_key, buckets in store.segments.items()
+            for bucket, sketch in buckets.items()
+        )
+        segment_counts = {}
+        for key, sketch in sketches:
+            segment = key.split(KEY_SEPARATOR, 1)[0]
+            segment_counts[segment] = segment_counts.get(segment, 0) + sketch.count
+        builder.add_table(
+            "segment_counts",
+            sorted(segment_counts),
+            [[segment_counts[segment]] for segment in sorted(segment_counts)],
+        )
+        builder.add_table(
+            "sketches",
+            [key for key, _ in sketches],
+            [
+                [number for pair in sketch.weighted_items() for number in pair]
+                for _, sketch in sketches
+            ],
+        )
+
+        if comparables is not None:
+            make_keys, runs, model_keys = comparables.build()
+            builder.add_table("comparables", make_keys, runs)
+            builder.add_table("comparable_models", model_keys)
+
+        try:
+            with open(model_path, "r") as json_file:
+                model_data = json.load(json_file)
+        except FileNotFoundError:
+            model_data = None
+
+        if model_data is not None:
+            metadata["model"] = {
+                "model_coef": model_data["model_coef"],
+                "model_intercept": model_data["model_intercept"],
+            }
+            for name in ("make", "model"):
+                builder.add_table(
+                    f"{name}_classes",
+                    [
+                        value.encode()
+                        for value in model_data[f"label_encoder_{name}_classes"]
+                    ],
+                )
+
+        generation = (self._current_generation() or 0) + 1
+        builder.write(self._path(generation), generation, metadata)
+
+        current_path = os.path.join(self.directory, CURRENT_FILE)
+        tmp_current = f"{current_path}.{os.getpid()}.tmp"
+        with open(tmp_current, "w") as current:
+            current.write(str(generation))
+        os.replace(tmp_current, current_path)
+
+        self._remove_old_generations(generation)
+        return generation
+
+    def _remove_old_generations(self, generation: int) -> None:
+        for name in os.listdir(self.directory):
+            if not (name.startswith("snapshot-") and name.endswith(".bin")):
+                continue
+            snapshot_generation = int(name[len("snapshot-") : -len(".bin")])
+            if snapshot_generation <= generation - KEEP_GENERATIONS:
+                os.remove(os.path.join(self.directory, name))
+
+
+class SnapshotQuantileStore:
+    """
+    Serves segment sketches from the attached snapshot, with the same
+    ``get_sketch`` interface as :class:`SegmentQuantileStore`.
+    """
+
+    def __init__(self, manager: ServingSnapshotManager):
+        self.manager = manager
+
+    def get_sketch(
+        self, year: int, make: str, model: str, max_mileage: Optional[int] = None
+    ) -> Optional[KLLSketch]:
+        snapshot = self.manager.current()
+        if snapshot is None:
+            return None
+
+        table = snapshot.table("sketches")
+        segment_key = SegmentQuantileStore.segment_key(year, make, model)
+        k = snapshot.metadata["k"]
+        bucket_size = snapshot.metadata["bucket_size"]
+        merged = KLLSketch(k=k)
+
+        for index in table.prefix_range(segment_key.encode() + KEY_SEPARATOR):
+            bucket = table[index].split(KEY_SEPARATOR, 1)[1].decode()
+            if bucket_in_range(bucket, max_mileage, bucket_size):
+                merged.merge(KLLSketch.from_weighted(_pairs(table.values(index)), k=k))
+
+        return merged if merged.count else None
+
+    def segment_count(self, year: int, make: str, model: str) -> Optional[int]:
+        """
+        Returns the number of priced listings in the segment, without
+        reading its sketches, or None if no snapshot is attached.
+        """
+        snapshot = self.manager.current()
+        if snapshot is None or "segment_counts" not in snapshot.tables:
+            return None
+
+        table = snapshot.table("segment_counts")
+        segment_key = SegmentQuantileStore.segment_key(year, make, model)
+        index = table.find(segment_key.encode())
+        return int(table.values(index)[0]) if index >= 0 else 0
+
+
+serving_snapshot = ServingSnapshotManager(directory=config.SERVING_SNAPSHOT_DIR)
+snapshot_quantile_store = SnapshotQuantileStore(serving_snapshot)
+comparable_index = ComparableIndex(serving_snapshot)
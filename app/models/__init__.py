@@ -1 +1,2 @@
 from .estimate import *
+from .location import *
@@ -1,22 +1,26 @@
-from sqlalchemy import Boolean, Column, Index, Integer, String
+from sqlalchemy import Boolean, Column, Date, Index, Integer, String, UniqueConstraint
 
 from app.core.database.session import Base
 from app.models.mixins import TimeAuditMixin
 
+UNKNOWN_YEAR = 0
+
 
 class Vehicle(Base, TimeAuditMixin):
     __tablename__ = "vehicles"
+    # MySQL requires the partitioning column in every unique key.
+    __table_args__ = (UniqueConstraint("vin", "year", name="uq_vehicle_vin_year"),)
 
-    id = Column(Integer, primary_key=True)
-    year = Column(Integer, nullable=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    year = Column(Integer, primary_key=True, autoincrement=False, default=UNKNOWN_YEAR)
     make = Column(String(250), nullable=True)
     model = Column(String(250), nullable=True)
     trim = Column(String(500), nullable=True)
     dealer_name = Column(String(500), nullable=True)
     dealer_street = Column(String(500), nullable=True)
     dealer_city = Column(String(500), nullable=True)
-    dealer_state = Column(String(500), nullable=True)
-    dealer_zip = Column(String(500), nullable=True)
+    dealer_state = Column(String(50), nullable=True)
+    dealer_zip = Column(String(10), nullable=True)
     listing_price = Column(Integer, nullable=True)
     listing_mileage = Column(Integer, nullable=True)
     used = Column(Boolean, nullable=True)
@@ -24,16 +28,32 @@ class Vehicle(Base, TimeAuditMixin):
     style = Column(String(500), nullable=True)
     driven_wheels = Column(String(500), nullable=True)
     engine = Column(String(500), nullable=True)
-    vin = Column(String(500), unique=True, nullable=True)
+    vin = Column(String(500), nullable=True)
     fuel_type = Column(String(500), nullable=True)
     exterior_color = Column(String(500), nullable=True)
     interior_color = Column(String(500), nullable=True)
     seller_website = Column(String(500), nullable=True)
-    first_seen_date = Column(String(500), nullable=True)
-    last_seen_date = Column(String(500), nullable=True)
-    dealer_vdp_last_seen_date = Column(String(500), nullable=True)
+    first_seen_date = Column(Date, nullable=True)
+    last_seen_date = Column(Date, nullable=True)
+    dealer_vdp_last_seen_date = Column(Date, nullable=True)
     listing_status = Column(String(500), nullable=True)
 
 
 Index("ix_vehicle_make_model", Vehicle.make, Vehicle.model)
 Index("ix_vehicle_price_mileage", Vehicle.listing_price, Vehicle.listing_mileage)
+Index("ix_vehicle_first_seen_date", Vehicle.first_seen_date)
+Index("ix_vehicle_last_seen_date", Vehicle.last_seen_date)
+Index(
+    "ix_vehicle_segment_state",
+    Vehicle.make,
+    Vehicle.model,
+    Vehicle.year,
+    Vehicle.dealer_state,
+)
+Index(
+    "ix_vehicle_segment_zip",
+    Vehicle.make,
+    Vehicle.model,
+    Vehicle.year,
+    Vehicle.dealer_zip,
+)
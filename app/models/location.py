@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Float, Index, String
+
+from app.core.database.session import Base
+
+
+class ZipCentroid(Base):
+    __tablename__ = "zip_centroids"
+
+    zip_code = Column(String(10), primary_key=True)
+    latitude = Column(Float, nullable=False)
+    longitude = Column(Float, nullable=False)
+
+
+Index("ix_zip_centroid_lat_lon", ZipCentroid.latitude, ZipCentroid.longitude)
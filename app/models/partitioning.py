@@ -0,0 +1,185 @@
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import Column, MetaData, Table, UniqueConstraint, inspect, text
+from sqlalchemy.engine import Connection
+
+from app.core.config import config
+from app.models.estimate import UNKNOWN_YEAR, Vehicle
+
+
+class YearRangePartitioning:
+    """
+    Range partitioning of the vehicles table by model year.
+
+    ``bounds`` are the exclusive upper bounds of the partitions, followed by
+    a catch-all partition for later years. Listings without a year are
+    stored as ``UNKNOWN_YEAR`` and land in the first partition.
+
+    On MySQL the table is natively partitioned and the server prunes
+    queries that filter on ``year``. SQLite, used for offline testing,
+    emulates it with one table per partition behind a read-only
+    ``vehicles`` view; repositories route writes and per-year reads to the
+    partition tables themselves.
+    """
+
+    def __init__(self, bounds: Sequence[int], emulated: bool = False):
+        self.bounds = sorted(bounds)
+        self.names = [f"p_lt{bound}" for bound in self.bounds] + ["p_max"]
+        self.emulated = emulated
+        self.metadata = MetaData()
+        self._tables: Dict[str, Table] = {}
+
+    def partition_for(self, year: Optional[int]) -> str:
+        return self.names[bisect_right(self.bounds, year or UNKNOWN_YEAR)]
+
+    def group(self, records: Iterable[dict]) -> Dict[str, List[dict]]:
+        """
+        Groups row dictionaries by the partition their ``year`` falls in.
+        """
+        partitions: Dict[str, List[dict]] = {}
+        for record in records:
+            partitions.setdefault(self.partition_for(record.get("year")), []).append(
+                record
+            )
+        return partitions
+
+    def table(self, partition: str) -> Table:
+        """
+        Returns the table holding a partition: the vehicles table itself
+        when partitioning is native, or the partition's own table when it
+        is emulated.
+        """
+        if not self.emulated:
+            return Vehicle.__table__
+        return self._partition_table(partition)
+
+    def _partition_table(self, partition: str) -> Table:
+        if partition not in self._tables:
+            self._tables[partition] = self._single_key_table(
+                f"{Vehicle.__tablename__}_{partition}",
+                self.metadata,
+                UniqueConstraint("vin", "year"),
+            )
+        return self._tables[partition]
+
+    @staticmethod
+    def _single_key_table(name: str, metadata: MetaData, *constraints) -> Table:
+        # Only ``id`` is the key, so SQLite assigns it as a rowid alias.
+        columns = [
+            Column(
+                column.name,
+                column.type,
+                primary_key=column.name == "id",
+                nullable=column.nullable,
+                server_default=column.server_default and column.server_default.arg,
+            )
+            for column in Vehicle.__table__.columns
+        ]
+        return Table(name, metadata, *columns, *constraints)
+
+    def table_for(self, year: Optional[int]) -> Table:
+        return self.table(self.partition_for(year))
+
+    def mysql_clause(self) -> str:
+        partitions = [
+            f"PARTITION {name} VALUES LESS THAN ({bound})"
+            for name, bound in zip(self.names, self.bounds)
+        ]
+        partitions.append(f"PARTITION {self.names[-1]} VALUES LESS THAN MAXVALUE")
+        return f"PARTITION BY RANGE (year) ({', '.join(partitions)})"
+
+    def create_emulated(self, connection: Connection) -> None:
+        """
+        Creates the partition tables and replaces the vehicles table with a
+        UNION ALL view over them, moving any existing rows across.
+        """
+        vehicles = Vehicle.__tablename__
+        for name in self.names:
+            table = self._partition_table(name)
+            table.create(connection, checkfirst=True)
+            for index in Vehicle.__table__.indexes:
+                columns = ", ".join(column.name for column in index.columns)
+                connection.execute(
+                    text(
+                        f"CREATE INDEX IF NOT EXISTS {index.name}_{name} "
+                        f"ON {table.name} ({columns})"
+                    )
+                )
+
+        if vehicles in inspect(connection).get_table_names():
+            for name in self.names:
+                table = self._partition_table(name)
+                connection.execute(
+                    text(
+                        f"INSERT INTO {table.name} ({self._columns()}) "
+                        f"SELECT {self._columns(select=True)} FROM {vehicles} "
+                        f"WHERE {self._year_condition(name)}"
+                    )
+                )
+            connection.execute(text(f"DROP TABLE {vehicles}"))
+
+        selects = " UNION ALL ".join(
+            f"SELECT {self._columns(with_id=True)} "
+            f"FROM {self._partition_table(name).name}"
+            for name in self.names
+        )
+        connection.execute(text(f"DROP VIEW IF EXISTS {vehicles}"))
+        connection.execute(text(f"CREATE VIEW {vehicles} AS {selects}"))
+
+    def drop_emulated(self, connection: Connection) -> None:
+        """
+        Reverses ``create_emulated``, folding the partitions back into a
+        single vehicles table.
+        """
+        vehicles = Vehicle.__tablename__
+        connection.execute(text(f"DROP VIEW IF EXISTS {vehicles}"))
+        self._single_key_table(vehicles, MetaData(), UniqueConstraint("vin")).create(
+            connection
+        )
+        for index in Vehicle.__table__.indexes:
+            columns = ", ".join(column.name for column in index.columns)
+            connection.execute(
+                text(f"CREATE INDEX {index.name} ON {vehicles} ({columns})")
+            )
+        for name in self.names:
+            table = self._partition_table(name)
+            connection.execute(
+                text(
+                    f"INSERT INTO {vehicles} ({self._columns()}) "
+                    f"SELECT {self._columns()} FROM {table.name}"
+                )
+            )
+            table.drop(connection)
+
+    @staticmethod
+    def _columns(select: bool = False, with_id: bool = False) -> str:
+        """
+        The vehicle columns, by default without ``id``, which each table
+        assigns itself.
+        """
+        return ", ".join(
+            (
+                f"COALESCE(year, {UNKNOWN_YEAR})"
+                if select and column.name == "year"
+                else column.name
+            )
+            for column in Vehicle.__table__.columns
+            if with_id or column.name != "id"
+        )
+
+    def _year_condition(self, partition: str) -> str:
+        position = self.names.index(partition)
+        year = f"COALESCE(year, {UNKNOWN_YEAR})"
+        conditions = []
+        if position > 0:
+            conditions.append(f"{year} >= {self.bounds[position - 1]}")
+        if position < len(self.bounds):
+            conditions.append(f"{year} < {self.bounds[position]}")
+        return " AND ".join(conditions)
+
+
+vehicle_partitioning = YearRangePartitioning(
+    bounds=config.VEHICLE_PARTITION_YEARS,
+    emulated=config.DATABASE_URL.startswith("sqlite"),
+)
@@ -1,5 +1,9 @@
 from .estimate_base import EstimateRepository
+from .location import ZipCentroidRepository
+from .vehicle import VehicleRepository
 
 __all__ = [
     "EstimateRepository",
+    "VehicleRepository",
+    "ZipCentroidRepository",
 ]
@@ -1,7 +1,7 @@
 from functools import reduce
 from typing import Any, Generic, Type, TypeVar, List, Set
 
-from sqlalchemy import Select, func, insert
+from sqlalchemy import Select, func, insert, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql.expression import select
 
@@ -25,6 +25,15 @@ class BaseRepository(Generic[ModelType]):
         """
         await self.session.execute(insert(self.model_class), records)
 
+    async def update_many(self, records: List[dict]):
+        """
+        Update multiple records in the database by primary key.
+
+        :param records: List of dictionaries, each holding the primary key
+            and the columns to update.
+        """
+        await self.session.execute(update(self.model_class), records)
+
     async def _query(
         self,
         join_=None,
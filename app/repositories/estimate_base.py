@@ -1,24 +1,45 @@
-from typing import List
+from typing import List, Optional
+
+from sqlalchemy import select
 
 from app.models.estimate import Vehicle
+from app.models.partitioning import vehicle_partitioning
 from app.repositories.base import BaseRepository
+from app.repositories.filters import active_listing
 
 
 class EstimateRepository(BaseRepository[Vehicle]):
     async def get_estimate(
-        self, year: int, make: str, model: str, listing_mileage: int
+        self,
+        year: int,
+        make: str,
+        model: str,
+        listing_mileage: int,
+        state: Optional[str] = None,
+        zip_codes: Optional[List[str]] = None,
     ) -> List[Vehicle]:
-        query = await self._query()
+        # Every estimate is for one year, so it reads a single partition.
+        table = vehicle_partitioning.table_for(year)
+        make_column, model_column = table.c.make, table.c.model
+        if vehicle_partitioning.emulated:
+            # Requests carry normalized names. MySQL's default collation
+            # already compares case-insensitively; SQLite's does not.
+            make_column = make_column.collate("NOCASE")
+            model_column = model_column.collate("NOCASE")
+
+        query = select(table).where(
+            table.c.year == year,
+            make_column == make,
+            model_column == model,
+            active_listing(table),
+        )
         if listing_mileage != 0:
-            query = query.filter(
-                Vehicle.year == year,
-                Vehicle.make == make,
-                Vehicle.model == model,
-                Vehicle.listing_mileage <= listing_mileage,
-            )
-        else:
-            query = query.filter(
-                Vehicle.year == year, Vehicle.make == make, Vehicle.model == model
-            )
-
-        return await self._all(query)
+            query = query.where(table.c.listing_mileage <= listing_mileage)
+
+        if state is not None:
+            query = query.where(table.c.dealer_state == state)
+
+        if zip_codes is not None:
+            query = query.where(table.c.dealer_zip.in_(zip_codes))
+
+        return await self._all(select(Vehicle).from_statement(query))
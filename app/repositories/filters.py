@@ -0,0 +1,17 @@
+from sqlalchemy import Table, or_
+from sqlalchemy.sql.elements import ColumnElement
+
+DELISTED_STATUS = "delisted"
+
+
+def active_listing(table: Table) -> ColumnElement[bool]:
+    """
+    Predicate selecting the rows of a vehicles table (or one of its
+    partitions) that have not been delisted.
+
+    :param table: The table to filter.
+    """
+    return or_(
+        table.c.listing_status.is_(None),
+        table.c.listing_status != DELISTED_STATUS,
+    )
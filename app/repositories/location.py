@@ -0,0 +1,46 @@
+from typing import List, Optional
+
+from app.models.location import ZipCentroid
+from app.repositories.base import BaseRepository
+from app.utils.geo import bounding_box, haversine_miles
+
+
+class ZipCentroidRepository(BaseRepository[ZipCentroid]):
+    async def get_zips_within(
+        self, zip_code: str, radius_miles: float
+    ) -> Optional[List[str]]:
+        """
+        Returns the ZIP codes whose centroid lies within the radius of the
+        given ZIP code. Candidates are prefiltered with an index-backed
+        bounding box before the exact distance check.
+
+        :param zip_code: The ZIP code at the center of the search.
+        :param radius_miles: The search radius in miles.
+        :return: The matching ZIP codes, or None if the ZIP code is unknown.
+        """
+        query = await self._query()
+        query = await self._get_by(query, "zip_code", zip_code)
+        origin = await self.session.scalar(query)
+        if origin is None:
+            return None
+
+        min_lat, max_lat, min_lon, max_lon = bounding_box(
+            origin.latitude, origin.longitude, radius_miles
+        )
+        query = await self._query()
+        query = query.where(
+            ZipCentroid.latitude.between(min_lat, max_lat),
+            ZipCentroid.longitude.between(min_lon, max_lon),
+        )
+
+        return [
+            candidate.zip_code
+            for candidate in await self._all(query)
+            if haversine_miles(
+                origin.latitude,
+                origin.longitude,
+                candidate.latitude,
+                candidate.longitude,
+            )
+            <= radius_miles
+        ]
@@ -0,0 +1,198 @@
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import bindparam, delete, func, insert, select, update
+
+from app.models.estimate import UNKNOWN_YEAR, Vehicle
+from app.models.partitioning import vehicle_partitioning
+from app.repositories.base import BaseRepository
+from app.repositories.filters import DELISTED_STATUS, active_listing
+
+
+class VehicleRepository(BaseRepository[Vehicle]):
+    async def insert_many(self, records: List[dict]):
+        """
+        Insert multiple records, routed to their partitions when
+        partitioning is emulated.
+
+        :param records: List of dictionaries, each representing a row to be inserted.
+        """
+        if not vehicle_partitioning.emulated:
+            return await super().insert_many(records)
+
+        for partition, rows in vehicle_partitioning.group(records).items():
+            await self.insert_partition(partition, rows)
+
+    async def insert_partition(self, partition: str, records: List[dict]):
+        """
+        Insert records that all belong to one partition. Loaders writing
+        different partitions on separate sessions do not contend with each
+        other.
+
+        :param partition: The partition name.
+        :param records: List of dictionaries, each representing a row to be inserted.
+        """
+        await self.session.execute(
+            insert(vehicle_partitioning.table(partition)), records
+        )
+
+    async def update_many(self, records: List[dict]):
+        """
+        Update multiple records by primary key, routed to their partitions
+        when partitioning is emulated.
+
+        :param records: List of dictionaries, each holding the primary key
+            (``id`` and ``year``) and the columns to update.
+        """
+        if not vehicle_partitioning.emulated:
+            return await super().update_many(records)
+
+        for partition, rows in vehicle_partitioning.group(records).items():
+            table = vehicle_partitioning.table(partition)
+            columns = [key for key in rows[0] if key not in ("id", "year")]
+            await self.session.execute(
+                update(table)
+                .where(table.c.id == bindparam("key_id"))
+                .values({column: bindparam(column) for column in columns}),
+                [
+                    {**{column: row[column] for column in columns}, "key_id": row["id"]}
+                    for row in rows
+                ],
+            )
+
+    async def delete_many(self, records: List[dict]):
+        """
+        Delete multiple records by primary key, with one statement per
+        partition.
+
+        :param records: List of dictionaries, each holding the primary key
+            (``id`` and ``year``).
+        """
+        for partition, rows in vehicle_partitioning.group(records).items():
+            table = vehicle_partitioning.table(partition)
+            await self.session.execute(
+                delete(table).where(
+                    table.c.id.in_([row["id"] for row in rows]),
+                    table.c.year.in_({row["year"] for row in rows}),
+                )
+            )
+
+    async def get_by_vins(
+        self, vins: List[str], years: Optional[Iterable[int]] = None
+    ) -> Dict[str, Vehicle]:
+        """
+        Returns the vehicles with the given VINs, keyed by VIN.
+
+        :param vins: The VINs to look up.
+        :param years: The model years of the VINs, if known, so that only
+            their partitions are searched.
+        :return: A mapping of VIN to vehicle.
+        """
+        if not vins:
+            return {}
+
+        if years is None:
+            partitions = vehicle_partitioning.names
+        else:
+            years = set(years)
+            partitions = sorted({vehicle_partitioning.partition_for(y) for y in years})
+
+        vehicles: Dict[str, Vehicle] = {}
+        for table in self._tables(partitions):
+            query = select(table).where(table.c.vin.in_(vins))
+            if years is not None:
+                query = query.where(table.c.year.in_(years))
+            for vehicle in await self._all(select(Vehicle).from_statement(query)):
+                vehicles[vehicle.vin] = vehicle
+        return vehicles
+
+    async def get_active_vins(self) -> Set[str]:
+        """
+        Returns the VINs of all vehicles that have not been delisted.
+        """
+        query = select(Vehicle.vin).where(
+            Vehicle.vin.is_not(None),
+            active_listing(Vehicle.__table__),
+        )
+        result = await self.session.execute(query)
+        return set(result.scalars().all())
+
+    async def iter_price_rows(
+        self, makes: Optional[Iterable[str]] = None, batch_size: int = 10000
+    ) -> AsyncIterator[List[Tuple[str, str, int, Optional[int], int]]]:
+        """
+        Yields ``(make, model, year, mileage, price)`` for every active
+        vehicle with a make, model, known year and price, in batches
+        streamed from the database. The mileage may be None.
+
+        :param makes: Normalized makes to limit the rows to.
+        :param batch_size: Number of rows per batch.
+        """
+        query = select(
+            Vehicle.make,
+            Vehicle.model,
+            Vehicle.year,
+            Vehicle.listing_mileage,
+            Vehicle.listing_price,
+        ).where(
+            Vehicle.make.is_not(None),
+            Vehicle.model.is_not(None),
+            Vehicle.year != UNKNOWN_YEAR,
+            Vehicle.listing_price.is_not(None),
+            active_listing(Vehicle.__table__),
+        )
+        if makes is not None:
+            query = query.where(func.lower(func.trim(Vehicle.make)).in_(list(makes)))
+
+        result = await self.session.stream(
+            query.execution_options(yield_per=batch_size)
+        )
+        async for rows in result.partitions():
+            yield [tuple(row) for row in rows]
+
+    async def mark_delisted(self, vins: List[str]) -> None:
+        """
+        Marks the vehicles with the given VINs as delisted.
+
+        :param vins: The VINs to delist.
+        """
+        await self.update_by_vins(vins, {"listing_status": DELISTED_STATUS})
+
+    async def update_by_vins(
+        self, vins: List[str], values: dict, years: Optional[Iterable[int]] = None
+    ) -> None:
+        """
+        Sets the same column values on every vehicle with one of the given
+        VINs, with one statement per table.
+
+        :param vins: The VINs to update.
+        :param values: The columns to set.
+        :param years: The model years of the VINs, if known, so that only
+            their partitions are updated.
+        """
+        if not vins:
+            return
+
+        if years is None:
+            partitions = vehicle_partitioning.names
+        else:
+            years = set(years)
+            partitions = sorted({vehicle_partitioning.partition_for(y) for y in years})
+
+        for table in self._tables(partitions):
+            query = update(table).where(table.c.vin.in_(vins))
+            if years is not None:
+                query = query.where(table.c.year.in_(years))
+            await self.session.execute(query.values(values))
+
+    @staticmethod
+    def _tables(partitions: List[str]):
+        """
+        The distinct tables holding the given partitions: one per partition
+        when emulated, otherwise the partitioned vehicles table once.
+        """
+        seen = set()
+        for partition in partitions:
+            table = vehicle_partitioning.table(partition)
+            if table.name not in seen:
+                seen.add(table.name)
+                yield table
@@ -1,6 +1,11 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator, model_validator
 from typing import Optional
 
+from app.utils.text import normalize_name
+
+MAX_YEAR = 2024
+MAX_RADIUS_MILES = 500
+
 
 class EstimateRequest(BaseModel):
     year: int = Field(..., description="The year of the vehicle", examples=[2015])
@@ -9,3 +14,62 @@ class EstimateRequest(BaseModel):
     mileage: Optional[int] = Field(
         None, description="The mileage of the vehicle", examples=[150000]
     )
+    state: Optional[str] = Field(
+        None, description="The dealer state to restrict to", examples=["TX"]
+    )
+    zip_code: Optional[str] = Field(
+        None, description="The ZIP code at the center of the search", examples=["78701"]
+    )
+    radius_miles: Optional[float] = Field(
+        None, description="Search radius around the ZIP code in miles", examples=[50]
+    )
+
+    @field_validator("year")
+    @classmethod
+    def check_year(cls, value: int) -> int:
+        if not 0 <= value <= MAX_YEAR:
+            raise ValueError(f"Year must be between 0 and {MAX_YEAR}.")
+        return value
+
+    @field_validator("make", "model")
+    @classmethod
+    def normalize_names(cls, value: str) -> str:
+        # Normalized once here, so requests differing only in case or
+        # spacing share cache entries and coalesce.
+        return normalize_name(value)
+
+    @field_validator("mileage")
+    @classmethod
+    def check_mileage(cls, value: Optional[int]) -> Optional[int]:
+        if value is not None and value < 0:
+            raise ValueError("Mileage cannot be negative.")
+        return value
+
+    @field_validator("state")
+    @classmethod
+    def normalize_state(cls, value: Optional[str]) -> Optional[str]:
+        if value is None:
+            return None
+        return value.strip().upper() or None
+
+    @field_validator("zip_code")
+    @classmethod
+    def normalize_zip_code(cls, value: Optional[str]) -> Optional[str]:
+        if value is None:
+            return None
+        return value.strip()[:5] or None
+
+    @model_validator(mode="after")
+    def check_radius(self) -> "EstimateRequest":
+        if self.radius_miles is None:
+            # A ZIP code only matters as the center of a radius search.
+            self.zip_code = None
+            return self
+
+        if self.zip_code is None:
+            raise ValueError("A ZIP code is required with a radius.")
+        if not 0 < self.radius_miles <= MAX_RADIUS_MILES:
+            raise ValueError(
+                f"Radius must be between 0 and {MAX_RADIUS_MILES} miles."
+            )
+        return self
@@ -10,7 +10,9 @@ class VehicleSample(BaseModel):
     listing_mileage: Optional[int] = Field(
         None, description="The mileage of the vehicle"
     )
-    dealer_city: str = Field(..., description="The location of the vehicle")
+    dealer_city: Optional[str] = Field(
+        None, description="The location of the vehicle"
+    )
 
 
 class EstimateResponse(BaseModel):
@@ -20,3 +22,23 @@ class EstimateResponse(BaseModel):
     samples: List[VehicleSample] = Field(
         ..., description="List of sample vehicles used to calculate the average price"
     )
+    price_p10: Optional[float] = Field(
+        None, description="The 10th percentile listing price of the segment"
+    )
+    price_p50: Optional[float] = Field(
+        None, description="The median listing price of the segment"
+    )
+    price_p90: Optional[float] = Field(
+        None, description="The 90th percentile listing price of the segment"
+    )
+    confidence_low: Optional[float] = Field(
+        None, description="Lower bound (25th percentile) of the price confidence band"
+    )
+    confidence_high: Optional[float] = Field(
+        None, description="Upper bound (75th percentile) of the price confidence band"
+    )
+    fallback_used: bool = Field(
+        False,
+        description="Whether the estimate is based on the nearest comparable "
+        "listings because no exact year, make and model matches were found",
+    )
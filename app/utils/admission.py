@@ -0,0 +1,137 @@
+import asyncio
+import heapq
+import itertools
+from contextlib import asynccontextmanager
+from typing import List
+
+from app.core.exceptions.base import ServiceUnavailableException
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+
+class AdmissionController:
+    """
+    Concurrency limiter with a bounded, prioritised wait queue.
+
+    Up to ``max_concurrency`` callers run at once and up to ``max_queue``
+    more wait, lowest priority value first. Callers are rejected with a
+    503 when the queue is full or they have waited ``queue_timeout``
+    seconds, instead of piling up behind a saturated resource. A
+    higher-priority arrival at a full queue displaces the lowest-priority
+    waiter.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int,
+        max_queue: int,
+        queue_timeout: float,
+        retry_after: int = 1,
+    ):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._in_flight = 0
+        self._queued = 0
+        self._waiters: List[list] = []
+        self._sequence = itertools.count()
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.max_queued = 0
+
+    def _rejection(self, reason: str) -> ServiceUnavailableException:
+        return ServiceUnavailableException(
+            custom_msg=f"{self.name} is saturated ({reason}). Retry shortly.",
+            retry_after=self.retry_after,
+        )
+
+    def _enqueue(self, priority: int) -> asyncio.Future:
+        if self._queued >= self.max_queue:
+            live = [entry for entry in self._waiters if not entry[2].done()]
+            worst = max(live, default=None)
+            if worst is None or worst[0] <= priority:
+                self.rejected += 1
+                raise self._rejection("queue full")
+
+            worst[2].set_exception(self._rejection("displaced"))
+            self.rejected += 1
+            self._queued -= 1
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, [priority, next(self._sequence), future])
+        self._queued += 1
+        self.max_queued = max(self.max_queued, self._queued)
+        return future
+
+    async def _acquire(self, priority: int) -> None:
+        if self._in_flight < self.max_concurrency and not self._queued:
+            self._in_flight += 1
+            self.admitted += 1
+            return
+
+        future = self._enqueue(priority)
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._queued -= 1
+            self.timed_out += 1
+            self.rejected += 1
+            raise self._rejection("queue timeout")
+        except asyncio.CancelledError:
+            if not future.done() or future.cancelled():
+                self._queued -= 1
+            elif future.exception() is None:
+                # The slot was handed over just before the cancellation.
+                self._release()
+            raise
+
+        self.admitted += 1
+
+    def _release(self) -> None:
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                # Hand the slot straight to the next waiter.
+                self._queued -= 1
+                future.set_result(None)
+                return
+        self._in_flight -= 1
+
+    @asynccontextmanager
+    async def admit(self, priority: int = PRIORITY_NORMAL):
+        """
+        Holds a slot for the duration of the block.
+
+        :param priority: ``PRIORITY_HIGH``, ``PRIORITY_NORMAL`` or ``PRIORITY_LOW``.
+        :raises ServiceUnavailableException: When no slot is available in time.
+        """
+        await self._acquire(priority)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def busy(self, max_load: float) -> bool:
+        """
+        Whether anyone is waiting or more than ``max_load`` of the slots are
+        taken. Background work checks this to stay out of the way of live
+        traffic.
+        """
+        return bool(self._queued) or self._in_flight > max_load * self.max_concurrency
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self._in_flight,
+            "queued": self._queued,
+            "max_queued": self.max_queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
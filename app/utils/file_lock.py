@@ -0,0 +1,27 @@
+import asyncio
+import fcntl
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+
+@asynccontextmanager
+async def file_lock(path: str) -> AsyncIterator[None]:
+    """
+    Holds an exclusive ``flock`` on ``path`` for the duration of the block,
+    so that only one server worker process on the host runs it at a time.
+    Waiting for the lock happens on a thread and does not block the event
+    loop. The lock is released if the process dies.
+
+    :param path: The lock file, created if missing.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    with open(path, "a") as lock_file:
+        await asyncio.to_thread(fcntl.flock, lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
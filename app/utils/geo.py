@@ -0,0 +1,33 @@
+import math
+from typing import Tuple
+
+EARTH_RADIUS_MILES = 3958.8
+
+
+def haversine_miles(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Great-circle distance between two points, in miles.
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+
+    a = (
+        math.sin(d_phi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_MILES * math.asin(math.sqrt(a))
+
+
+def bounding_box(
+    latitude: float, longitude: float, radius_miles: float
+) -> Tuple[float, float, float, float]:
+    """
+    Returns a (min_lat, max_lat, min_lon, max_lon) box that contains every
+    point within ``radius_miles`` of the given point.
+    """
+    d_lat = math.degrees(radius_miles / EARTH_RADIUS_MILES)
+    cos_lat = max(math.cos(math.radians(latitude)), 1e-6)
+    d_lon = min(math.degrees(radius_miles / (EARTH_RADIUS_MILES * cos_lat)), 180.0)
+
+    return latitude - d_lat, latitude + d_lat, longitude - d_lon, longitude + d_lon
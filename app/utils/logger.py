@@ -1,23 +1,161 @@
+import atexit
+import copy
+import json
 import logging
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+from app.core.config import config
+
+# Attributes every LogRecord has; anything else was passed via ``extra``.
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message"}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats a record as one JSON object per line. Fields passed through
+    ``extra`` are included as top-level keys.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        payload.update(
+            (key, value)
+            for key, value in vars(record).items()
+            if key not in RECORD_ATTRIBUTES
+        )
+        if record.exc_text:
+            payload["exception"] = record.exc_text
+
+        return json.dumps(payload, default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Queue handler that never blocks the caller: when the queue is full the
+    record is dropped and counted instead.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge the arguments and render any traceback now, since the
+        # record is formatted on the listener thread. Unlike the default,
+        # the message and traceback are kept apart for structured output.
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
 
 
 class AppLogger:
-    def __init__(self, name: str, level: int = logging.INFO):
+    """
+    Logger whose records are handed to a background listener thread
+    through a bounded queue, so a slow stream never stalls the event loop.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        level: int = logging.INFO,
+        json_format: bool = False,
+        queue_size: int = 10000,
+    ):
         self.logger = logging.getLogger(name)
         self.logger.setLevel(level)
+        self.listener: Optional[QueueListener] = None
 
         if not self.logger.hasHandlers():
             console_handler = logging.StreamHandler()
             console_handler.setLevel(level)
 
-            formatter = logging.Formatter(
-                "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-            )
+            if json_format:
+                formatter = JsonFormatter()
+            else:
+                formatter = logging.Formatter(
+                    "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+                )
             console_handler.setFormatter(formatter)
-            self.logger.addHandler(console_handler)
+
+            log_queue = queue.Queue(maxsize=queue_size)
+            self.logger.addHandler(DroppingQueueHandler(log_queue))
+            self.listener = QueueListener(
+                log_queue, console_handler, respect_handler_level=True
+            )
+            self.listener.start()
+            atexit.register(self.stop)
+
+    def stop(self) -> None:
+        """
+        Flushes the queued records and stops the listener thread.
+        """
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
 
     def get_logger(self):
         return self.logger
 
 
-app_logger = AppLogger(name="carvalue_logger").get_logger()
+class ProgressLogger:
+    """
+    Accumulates progress counters and logs them at most once every
+    ``interval`` seconds, instead of once per batch.
+    """
+
+    def __init__(self, logger: logging.Logger, label: str, interval: float = 5.0):
+        self.logger = logger
+        self.label = label
+        self.interval = interval
+        self.counts: Dict[str, int] = {}
+        self.started = time.monotonic()
+        self._logged = self.started
+
+    def add(self, **counts: int) -> None:
+        for key, value in counts.items():
+            self.counts[key] = self.counts.get(key, 0) + value
+
+        now = time.monotonic()
+        if now - self._logged >= self.interval:
+            self._logged = now
+            self._log("in progress")
+
+    def done(self) -> None:
+        self._log("done")
+
+    def _log(self, state: str) -> None:
+        elapsed = time.monotonic() - self.started
+        counts = ", ".join(f"{key}={value}" for key, value in self.counts.items())
+        self.logger.info(
+            f"{self.label} {state}: {counts} in {elapsed:.1f}s",
+            extra={
+                "progress": dict(self.counts),
+                "elapsed_seconds": round(elapsed, 3),
+            },
+        )
+
+
+app_logger = AppLogger(
+    name="carvalue_logger",
+    json_format=config.LOG_FORMAT == "json",
+    queue_size=config.LOG_QUEUE_SIZE,
+).get_logger()
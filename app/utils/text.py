@@ -0,0 +1,6 @@
+def normalize_name(value: str) -> str:
+    """
+    Canonical form of a make or model name for lookups: surrounding
+    whitespace removed and case folded, so ``"Honda "`` matches ``"honda"``.
+    """
+    return value.strip().casefold()
@@ -0,0 +1,165 @@
+import heapq
+import itertools
+import json
+import os
+from typing import Dict, Hashable, List, Optional, Tuple
+
+
+class SpaceSavingCounter:
+    """
+    Approximate top-K counter (Metwally et al.'s space-saving algorithm).
+
+    At most ``capacity`` keys are tracked. An untracked key replaces the
+    key with the lowest count and inherits that count, so counts are
+    overestimated by at most the evicted count (kept as ``error``). Any key
+    seen more than ``total / capacity`` times is guaranteed to be tracked.
+
+    The lowest count is found with a min-heap holding one entry per tracked
+    key. Increments do not touch the heap; an entry whose count went stale
+    is refreshed when it reaches the top, so ``add`` costs O(log capacity)
+    amortized.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity = capacity
+        self.total = 0
+        self.counts: Dict[Hashable, int] = {}
+        self.errors: Dict[Hashable, int] = {}
+        self._heap: List[Tuple[int, int, Hashable]] = []
+        self._sequence = itertools.count()
+        # Caller-defined label saved with the counts, such as the serving
+        # generation they were last decayed for.
+        self.epoch: Optional[str] = None
+
+    def _push(self, key: Hashable) -> None:
+        # The sequence number breaks ties, so keys are never compared.
+        heapq.heappush(self._heap, (self.counts[key], next(self._sequence), key))
+
+    def _rebuild_heap(self) -> None:
+        self._heap = [
+            (count, next(self._sequence), key) for key, count in self.counts.items()
+        ]
+        heapq.heapify(self._heap)
+
+    def _pop_min(self) -> Hashable:
+        while True:
+            count, _, key = heapq.heappop(self._heap)
+            if self.counts[key] == count:
+                return key
+            # Counted since it was pushed; requeue at its current count.
+            self._push(key)
+
+    def add(self, key: Hashable, count: int = 1) -> None:
+        self.total += count
+        if key in self.counts:
+            self.counts[key] += count
+            return
+
+        if len(self.counts) < self.capacity:
+            self.counts[key] = count
+            self.errors[key] = 0
+            self._push(key)
+            return
+
+        evicted = self._pop_min()
+        floor = self.counts.pop(evicted)
+        del self.errors[evicted]
+        self.counts[key] = floor + count
+        self.errors[key] = floor
+        self._push(key)
+
+    def merge(self, other: "SpaceSavingCounter") -> "SpaceSavingCounter":
+        """
+        Adds the counts of another counter (e.g. another worker's) and keeps
+        the ``capacity`` largest.
+
+        :param other: The counter to merge.
+        :return: This counter.
+        """
+        counts = dict(self.counts)
+        errors = dict(self.errors)
+        for key, count in other.counts.items():
+            counts[key] = counts.get(key, 0) + count
+            errors[key] = errors.get(key, 0) + other.errors[key]
+
+        kept = heapq.nlargest(self.capacity, counts, key=counts.__getitem__)
+        self.total += other.total
+        self.counts = {key: counts[key] for key in kept}
+        self.errors = {key: errors[key] for key in kept}
+        self._rebuild_heap()
+        return self
+
+    def clear(self) -> None:
+        self.total = 0
+        self.counts = {}
+        self.errors = {}
+        self._heap = []
+
+    def top(self, n: int) -> List[Tuple[Hashable, int]]:
+        """
+        Returns up to ``n`` ``(key, count)`` pairs, most frequent first.
+        """
+        return sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:n]
+
+    def decay(self, factor: float = 0.5) -> None:
+        """
+        Scales every count down so that recent traffic outweighs old traffic.
+        """
+        self.total = int(self.total * factor)
+        self.counts = {key: int(count * factor) for key, count in self.counts.items()}
+        self.errors = {key: int(error * factor) for key, error in self.errors.items()}
+        self._rebuild_heap()
+
+    def save(self, path: str) -> None:
+        data = {
+            "capacity": self.capacity,
+            "total": self.total,
+            "epoch": self.epoch,
+            "items": [
+                [list(key), count, self.errors[key]]
+                for key, count in self.counts.items()
+            ],
+        }
+
+        # Several server workers save to the same path; write a private
+        # file and swap it in, so a reader never sees a partial one.
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as json_file:
+            json.dump(data, json_file)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> None:
+        """
+        Restores counts saved by ``save``. Keys are stored as lists and
+        restored as tuples. The counter is left unchanged if the file
+        cannot be parsed.
+
+        :raises ValueError: If the file is not a valid saved counter.
+        """
+        with open(path, "r") as json_file:
+            data = json.load(json_file)
+
+        try:
+            capacity = int(data["capacity"])
+            total = int(data["total"])
+            counts = {}
+            errors = {}
+            for key, count, error in data["items"]:
+                counts[tuple(key)] = int(count)
+                errors[tuple(key)] = int(error)
+        except (KeyError, TypeError) as exception:
+            raise ValueError(f"Invalid counter file {path}: {exception!r}")
+
+        self.capacity = capacity
+        self.total = total
+        self.epoch = data.get("epoch")
+        self.counts = counts
+        self.errors = errors
+        self._rebuild_heap()
+
+    def stats(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "tracked": len(self.counts),
+            "total": self.total,
+        }
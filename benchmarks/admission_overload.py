@@ -0,0 +1,262 @@
+"""
+Open-loop overload tests of the estimate admission control.
+
+Requests arrive at a fixed rate above what the service can sustain.
+Without admission control every request queues and latency grows for the
+whole run; with it, excess requests are rejected quickly and the latency
+of admitted requests stays bounded.
+
+The first test drives the admission controller alone in front of a
+simulated database pool. The second drives the estimate route through an
+in-process ASGI transport against a database loaded with synthetic
+listings, with the configured admission limits and with them lifted.
+Results are not cached there, so every admitted request queries the
+database. It writes to ``DATABASE_URL`` when set, otherwise to a
+temporary SQLite database (see ``benchmarks.scratch_database``).
+
+Usage: python -m benchmarks.admission_overload [--overload 3.0] [--route-rows N]
+"""
+import argparse
+import asyncio
+import contextlib
+import itertools
+import os
+import time
+
+# Before any app module reads its configuration.
+from benchmarks.scratch_database import clear_vehicles, migrate
+
+import httpx
+
+from app.controllers import estimate_controller
+from app.core.database.session import async_session_factory, engine
+from app.core.exceptions import ServiceUnavailableException
+from app.core.server import create_app
+from app.integration.estimators import create_estimator
+from app.integration.inference import inference_executor
+from app.integration.ingest import _load_partition, _records, publish_serving_data
+from app.models.partitioning import vehicle_partitioning
+from app.utils.admission import PRIORITY_HIGH, PRIORITY_NORMAL, AdmissionController
+from app.utils.result_cache import GenerationCache
+from benchmarks.estimator_backends import synthetic_listings
+
+
+async def run(args, admission):
+    pool = asyncio.Semaphore(args.pool_size)
+    latencies = {PRIORITY_HIGH: [], PRIORITY_NORMAL: []}
+    rejected = 0
+
+    async def request(priority):
+        nonlocal rejected
+        started = time.perf_counter()
+        guard = (
+            admission.admit(priority)
+            if admission is not None
+            else contextlib.nullcontext()
+        )
+        try:
+            async with guard:
+                async with pool:
+                    await asyncio.sleep(args.service_ms / 1000)
+        except ServiceUnavailableException:
+            rejected += 1
+            return
+        latencies[priority].append(time.perf_counter() - started)
+
+    capacity = args.pool_size / (args.service_ms / 1000)
+    interval = 1 / (capacity * args.overload)
+    total = int(args.duration / interval)
+    tasks = []
+    for index in range(total):
+        priority = PRIORITY_HIGH if index % 10 == 0 else PRIORITY_NORMAL
+        tasks.append(asyncio.ensure_future(request(priority)))
+        await asyncio.sleep(interval)
+    await asyncio.gather(*tasks)
+
+    return total, rejected, latencies
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))] * 1000
+
+
+def report(name, total, rejected, latencies):
+    print(f"{name}: {total} requests, {rejected} rejected ({rejected / total:.0%})")
+    for priority, label in ((PRIORITY_HIGH, "cheap"), (PRIORITY_NORMAL, "normal")):
+        values = latencies[priority]
+        if values:
+            print(
+                f"  {label:<7} p50 {percentile(values, 50):8.1f} ms"
+                f"  p99 {percentile(values, 99):8.1f} ms"
+                f"  served {len(values)}"
+            )
+
+
+async def load_listings(df) -> list:
+    """
+    Loads listings and publishes serving data for them.
+
+    :return: The distinct ``(year, make, model)`` segments.
+    """
+    await clear_vehicles()
+    df = df.copy()
+    df.insert(0, "vin", [f"VIN{index:012d}" for index in range(len(df))])
+    df["dealer_city"] = "Austin"
+    df["dealer_state"] = "TX"
+    records = _records(df)
+    for partition, batch in vehicle_partitioning.group(records).items():
+        await _load_partition(partition, batch)
+
+    async with async_session_factory() as db_session:
+        await publish_serving_data(db_session)
+    return sorted({(r["year"], r["make"], r["model"]) for r in records})
+
+
+async def route_run(args, segments, rate=None):
+    """
+    Sends estimate requests for ``segments`` in turn, open loop at ``rate``
+    per second for ``args.duration`` seconds, or closed loop with
+    ``args.route_concurrency`` clients when ``rate`` is None.
+
+    :return: Requests sent, latencies of served requests, responses by
+        status code, and 503s that carried a Retry-After header.
+    """
+    # Server errors count as "other" rather than ending the run.
+    transport = httpx.ASGITransport(app=create_app(), raise_app_exceptions=False)
+    requests = itertools.cycle(segments)
+    latencies = []
+    statuses = {}
+    retry_after = 0
+
+    async def request(client):
+        nonlocal retry_after
+        year, make, model = next(requests)
+        started = time.perf_counter()
+        response = await client.get(
+            "/api/estimate",
+            params={"year": year, "make": make, "model": model, "mileage": 60000},
+        )
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        if response.status_code == 200:
+            latencies.append(time.perf_counter() - started)
+        elif response.status_code == 503 and "retry-after" in response.headers:
+            retry_after += 1
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        if rate is None:
+            total = args.route_capacity_requests
+
+            async def worker(count):
+                for _ in range(count):
+                    await request(client)
+
+            count = total // args.route_concurrency
+            total = count * args.route_concurrency
+            await asyncio.gather(
+                *(worker(count) for _ in range(args.route_concurrency))
+            )
+        else:
+            total = int(args.duration * rate)
+            tasks = []
+            started = time.perf_counter()
+            for index in range(total):
+                tasks.append(asyncio.ensure_future(request(client)))
+                # Keep to the schedule even when a sleep overshoots.
+                delay = started + (index + 1) / rate - time.perf_counter()
+                await asyncio.sleep(max(delay, 0))
+            await asyncio.gather(*tasks)
+
+    return total, latencies, statuses, retry_after
+
+
+def route_report(name, total, latencies, statuses, retry_after):
+    served = statuses.get(200, 0)
+    rejected = statuses.get(503, 0)
+    other = total - served - rejected
+    print(
+        f"{name}: {total} requests, {served} served, {rejected} rejected"
+        f" ({rejected / total:.0%}, {retry_after} with Retry-After), {other} other"
+    )
+    if latencies:
+        print(
+            f"  served  p50 {percentile(latencies, 50):8.1f} ms"
+            f"  p99 {percentile(latencies, 99):8.1f} ms"
+        )
+
+
+async def bench_route(args) -> None:
+    # One event loop throughout: the inference executor and the pooled
+    # connections are bound to the loop they were started on.
+    df = synthetic_listings(args.route_rows)
+    segments = await load_listings(df)
+    # Estimates with a mileage run the model, so train one on the listings.
+    estimator = create_estimator(
+        "linear",
+        os.path.join(os.environ["CARVALUE_BENCH_DIR"], "regression_model.json"),
+    )
+    estimator.train_from_dataframe(df)
+    estimator.save_model()
+    inference_executor.model_path = estimator.model_path
+    # Every admitted request goes to the database.
+    estimate_controller.estimate_cache = GenerationCache(max_entries=0)
+
+    started = time.perf_counter()
+    total, *_ = await route_run(args, segments)
+    capacity = total / (time.perf_counter() - started)
+    rate = capacity * args.overload
+    print(
+        f"route: {len(segments)} segments, {args.route_rows} listings,"
+        f" {capacity:.0f} requests/s closed loop, sending {rate:.0f} requests/s"
+    )
+
+    route_report("admission (configured)", *await route_run(args, segments, rate))
+    for limiter in (estimate_controller.estimate_admission, estimate_controller.db_admission):
+        stats = limiter.stats()
+        print(
+            f"  {limiter.name}: {stats['max_concurrency']} slots,"
+            f" max queued {stats['max_queued']}, rejected {stats['rejected']}"
+        )
+
+    unbounded = AdmissionController(
+        name="Unbounded", max_concurrency=10**9, max_queue=0, queue_timeout=0
+    )
+    estimate_controller.estimate_admission = unbounded
+    estimate_controller.db_admission = unbounded
+    route_report("unbounded", *await route_run(args, segments, rate))
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pool-size", type=int, default=15)
+    parser.add_argument("--service-ms", type=float, default=20.0)
+    parser.add_argument("--overload", type=float, default=3.0)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--max-concurrency", type=int, default=15)
+    parser.add_argument("--max-queue", type=int, default=30)
+    parser.add_argument("--queue-timeout-ms", type=float, default=100.0)
+    parser.add_argument("--route-rows", type=int, default=50000)
+    parser.add_argument("--route-concurrency", type=int, default=16)
+    parser.add_argument("--route-capacity-requests", type=int, default=400)
+    parser.add_argument("--skip-route", action="store_true")
+    args = parser.parse_args()
+
+    print("simulated pool")
+    report("unbounded", *asyncio.run(run(args, None)))
+    admission = AdmissionController(
+        name="Estimate service",
+        max_concurrency=args.max_concurrency,
+        max_queue=args.max_queue,
+        queue_timeout=args.queue_timeout_ms / 1000,
+    )
+    report("admission", *asyncio.run(run(args, admission)))
+
+    if not args.skip_route:
+        print(f"estimate route, {os.cpu_count()} CPUs, {engine.url}")
+        migrate()
+        asyncio.run(bench_route(args))
+
+
+if __name__ == "__main__":
+    main()
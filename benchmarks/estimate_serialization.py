@@ -0,0 +1,139 @@
+"""
+Compares the throughput of the HTML estimate route with the JSON estimate
+API, end to end through the application: routing, parameter parsing and
+validation, middleware and response rendering.
+
+Requests go through an in-process ASGI transport with the estimate
+computation replaced by a fixed synthetic response holding a full page
+of samples, so the numbers isolate what each route adds on top of the
+estimate itself. The serialization step alone is timed as well.
+
+Usage: python -m benchmarks.estimate_serialization [--requests N] [--concurrency C]
+"""
+import argparse
+import asyncio
+import json
+import time
+import timeit
+
+import httpx
+from fastapi.encoders import jsonable_encoder
+from fastapi.templating import Jinja2Templates
+
+from app.controllers import EstimateController
+from app.core.server import create_app
+from app.schemas.responses.estimate import EstimateResponse, VehicleSample
+
+templates = Jinja2Templates(directory="app/templates")
+
+PARAMS = {"year": 2015, "make": "Toyota", "model": "Camry", "mileage": 80000}
+
+
+def build_response(sample_count: int = 100) -> EstimateResponse:
+    samples = [
+        VehicleSample(
+            year=2015,
+            make="Toyota",
+            model="Camry",
+            listing_price=12000 + index * 10,
+            listing_mileage=60000 + index * 100,
+            dealer_city="Austin",
+        )
+        for index in range(sample_count)
+    ]
+    return EstimateResponse(
+        average_price=13500.0,
+        samples=samples,
+        price_p10=11000.0,
+        price_p50=13400.0,
+        price_p90=15900.0,
+        confidence_low=12300.0,
+        confidence_high=14600.0,
+    )
+
+
+async def route_throughput(client: httpx.AsyncClient, send, args) -> float:
+    remaining = args.requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            response = await send(client)
+            response.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return args.requests / (time.perf_counter() - started)
+
+
+async def bench_routes(response: EstimateResponse, args) -> None:
+    async def fixed_estimate(self, request, include_samples=True):
+        if include_samples:
+            return response
+        return response.model_copy(update={"samples": []})
+
+    EstimateController.get_estimate = fixed_estimate
+    transport = httpx.ASGITransport(app=create_app())
+
+    routes = {
+        "POST /estimate/ (html)": lambda client: client.post(
+            "/estimate/", data=PARAMS
+        ),
+        "GET /api/estimate (json)": lambda client: client.get(
+            "/api/estimate", params=PARAMS
+        ),
+        "GET /api/estimate (no samples)": lambda client: client.get(
+            "/api/estimate", params={**PARAMS, "include_samples": "false"}
+        ),
+    }
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, send in routes.items():
+            # Warm up imports, template compilation and pydantic schemas.
+            await send(client)
+            rate = await route_throughput(client, send, args)
+            print(f"{name:<32} {1e6 / rate:10.1f} us/request {rate:12.0f} requests/s")
+
+
+def bench_serialization(response: EstimateResponse, args) -> None:
+    template = templates.get_template("estimate_form_with_result.html")
+
+    cases = {
+        "html (jinja)": lambda: template.render(
+            average_price=response.average_price,
+            samples=response.samples,
+            price_p10=response.price_p10,
+            price_p50=response.price_p50,
+            price_p90=response.price_p90,
+            **PARAMS,
+        ),
+        "json (jsonable_encoder)": lambda: json.dumps(jsonable_encoder(response)),
+        "json (model_dump_json)": lambda: response.model_dump_json(),
+        "json (no samples)": lambda: response.model_dump_json(exclude={"samples"}),
+    }
+
+    for name, case in cases.items():
+        seconds = timeit.timeit(case, number=args.iterations)
+        print(
+            f"{name:<32} {seconds / args.iterations * 1e6:10.1f} us/response"
+            f" {args.iterations / seconds:12.0f} responses/s"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    response = build_response()
+    print("Route throughput")
+    asyncio.run(bench_routes(response, args))
+    print("Serialization only")
+    bench_serialization(response, args)
+
+
+if __name__ == "__main__":
+    main()
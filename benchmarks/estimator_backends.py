@@ -0,0 +1,133 @@
+"""
+Latency and throughput of each estimator backend, called one row at a
+time and through the micro-batching inference executor.
+
+Usage: python -m benchmarks.estimator_backends [--rows N] [--requests N]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.integration.estimators import ESTIMATOR_BACKENDS, create_estimator
+from app.integration.inference import InferenceExecutor
+
+MAKES = {
+    "Toyota": ["Camry", "Corolla", "RAV4", "Tacoma"],
+    "Honda": ["Civic", "Accord", "CR-V", "Pilot"],
+    "Ford": ["F-150", "Escape", "Explorer", "Mustang"],
+}
+
+
+def synthetic_listings(rows: int, seed: int = 40) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    pairs = [(make, model) for make, models in MAKES.items() for model in models]
+    picks = rng.integers(0, len(pairs), rows)
+    year = rng.integers(2005, 2023, rows)
+    mileage = rng.integers(0, 200000, rows)
+    base = 12000 + 1500 * (picks % 5)
+    price = base + 900 * (year - 2005) - 0.06 * mileage + rng.normal(0, 1500, rows)
+
+    return pd.DataFrame(
+        {
+            "make": [pairs[index][0] for index in picks],
+            "model": [pairs[index][1] for index in picks],
+            "year": year,
+            "listing_mileage": mileage,
+            "listing_price": price.round(),
+        }
+    )
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) * 1000
+
+
+def bench_single(estimator, rows):
+    latencies = []
+    for row in rows:
+        started = time.perf_counter()
+        estimator.predict_price(*row)
+        latencies.append(time.perf_counter() - started)
+    return len(rows) / sum(latencies), latencies
+
+
+async def bench_batched(executor, rows, concurrency):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(row):
+        async with semaphore:
+            started = time.perf_counter()
+            await executor.predict(row)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(row) for row in rows))
+    elapsed = time.perf_counter() - started
+    await executor.close()
+    return len(rows) / elapsed, latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50000, help="training rows")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    parser.add_argument("--pool", choices=["thread", "process"], default="thread")
+    args = parser.parse_args()
+
+    df = synthetic_listings(args.rows)
+    sample = df.sample(args.requests, random_state=1)
+    rows = list(
+        zip(
+            sample["listing_mileage"].tolist(),
+            sample["year"].tolist(),
+            sample["make"].tolist(),
+            sample["model"].tolist(),
+        )
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        for backend in ESTIMATOR_BACKENDS:
+            model_path = os.path.join(directory, f"{backend}.model")
+            estimator = create_estimator(backend, model_path)
+            started = time.perf_counter()
+            estimator.train_from_dataframe(df)
+            train_seconds = time.perf_counter() - started
+            estimator.save_model()
+
+            single_rps, single = bench_single(estimator, rows)
+            executor = InferenceExecutor(
+                backend=backend,
+                model_path=model_path,
+                max_batch_size=args.max_batch_size,
+                max_wait=args.max_wait_ms / 1000,
+                pool=args.pool,
+            )
+            batched_rps, batched = asyncio.run(
+                bench_batched(executor, rows, args.concurrency)
+            )
+
+            print(f"{backend} (trained in {train_seconds:.2f}s)")
+            print(
+                f"  single   {single_rps:10.0f} rows/s"
+                f"  p50 {percentile(single, 50):7.3f} ms"
+                f"  p99 {percentile(single, 99):7.3f} ms"
+            )
+            print(
+                f"  batched  {batched_rps:10.0f} rows/s"
+                f"  p50 {percentile(batched, 50):7.3f} ms"
+                f"  p99 {percentile(batched, 99):7.3f} ms"
+                f"  mean batch {executor.stats()['mean_batch_size']:.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
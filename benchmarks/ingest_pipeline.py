@@ -0,0 +1,142 @@
+"""
+Snapshot ingest throughput and event loop responsiveness, parsing inline
+on the event loop versus the process-pool pipeline, writing to a real
+database.
+
+A synthetic snapshot is written to a temporary file and loaded with
+``_load_partition``, as the server's startup load does. The rows go to
+the database named by ``DATABASE_URL``, which is migrated to head and
+has its vehicles deleted before each run, so point it at a scratch
+database. Without it, a temporary SQLite database is used (see
+``benchmarks.scratch_database``). A probe task measures how late the
+event loop wakes it up while the load runs.
+
+Usage: python -m benchmarks.ingest_pipeline [--rows N] [--workers 1 2 4]
+"""
+import argparse
+import asyncio
+import gc
+import os
+import tempfile
+import time
+
+# Before any app module reads its configuration.
+from benchmarks.scratch_database import clear_vehicles, migrate
+
+import pandas as pd
+
+from app.core.config import config
+from app.core.database.session import engine
+from app.integration.ingest import _load_partition, _records, run_ingest_pipeline
+from app.models.partitioning import vehicle_partitioning
+from benchmarks.estimator_backends import synthetic_listings
+
+
+def write_snapshot(path: str, rows: int) -> None:
+    df = synthetic_listings(rows)
+    df.insert(0, "vin", [f"VIN{index:012d}" for index in range(rows)])
+    df["dealer_city"] = "Austin"
+    df["dealer_state"] = "TX"
+    df["dealer_zip"] = "78701"
+    df["first_seen_date"] = "2022-08-01"
+    df["last_seen_date"] = "2022-08-17"
+    df.to_csv(path, sep="|", index=False)
+
+
+async def probe(stop: asyncio.Event, lags: list, interval: float = 0.005) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started - interval)
+
+
+async def timed(load) -> dict:
+    await clear_vehicles()
+    lags = []
+    stop = asyncio.Event()
+    probe_task = asyncio.ensure_future(probe(stop, lags))
+    started = time.perf_counter()
+    rows = await load()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe_task
+    # Pooled connections belong to this event loop.
+    await engine.dispose()
+    lags.sort()
+    return {
+        "rows_per_s": rows / elapsed,
+        "elapsed_s": elapsed,
+        "loop_lag_p99_ms": lags[int(len(lags) * 0.99)] * 1000,
+        "loop_lag_max_ms": lags[-1] * 1000,
+    }
+
+
+async def inline_load(path: str, args) -> int:
+    rows = 0
+    for chunk in pd.read_csv(
+        path, delimiter="|", chunksize=args.batch_rows, dtype={"dealer_zip": str}
+    ):
+        records = _records(chunk)
+        for partition, batch in vehicle_partitioning.group(records).items():
+            await _load_partition(partition, batch)
+        rows += len(records)
+    return rows
+
+
+async def pipeline_load(path: str, args, workers: int) -> int:
+    rows = 0
+
+    async def counting_write(partition, records):
+        nonlocal rows
+        await _load_partition(partition, records)
+        rows += len(records)
+
+    await run_ingest_pipeline(
+        path,
+        counting_write,
+        writers=args.writers,
+        workers=workers,
+        chunk_bytes=args.chunk_kb * 1024,
+    )
+    return rows
+
+
+def report(name: str, result: dict) -> None:
+    print(
+        f"{name:<20} {result['rows_per_s']:10.0f} rows/s"
+        f"  in {result['elapsed_s']:6.2f}s"
+        f"  loop lag p99 {result['loop_lag_p99_ms']:7.1f} ms"
+        f"  max {result['loop_lag_max_ms']:7.1f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument(
+        "--writers",
+        type=int,
+        default=1 if vehicle_partitioning.emulated else config.INGEST_PARTITION_WRITERS,
+        help="concurrent writers (default: as the startup load)",
+    )
+    parser.add_argument("--batch-rows", type=int, default=10000)
+    parser.add_argument("--chunk-kb", type=int, default=1024)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs, {engine.url}, {args.writers} writers")
+    migrate()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "snapshot.txt")
+        write_snapshot(path, args.rows)
+        # As the server does at startup.
+        gc.freeze()
+
+        report("inline", asyncio.run(timed(lambda: inline_load(path, args))))
+        for workers in args.workers:
+            result = asyncio.run(timed(lambda: pipeline_load(path, args, workers)))
+            report(f"pipeline x{workers}", result)
+
+
+if __name__ == "__main__":
+    main()
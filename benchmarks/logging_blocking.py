@@ -0,0 +1,119 @@
+"""
+Event loop stalls caused by log I/O, with a synchronous StreamHandler and
+with the queued AppLogger.
+
+The log stream sleeps on every write to simulate a slow stdout or log
+collector. A probe task measures how late the event loop wakes it up
+while request handlers log concurrently.
+
+Usage: python -m benchmarks.logging_blocking [--write-ms 2.0]
+"""
+import argparse
+import asyncio
+import io
+import logging
+import statistics
+import time
+
+from app.utils.logger import AppLogger
+
+
+class SlowStream(io.StringIO):
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+
+    def write(self, text: str) -> int:
+        time.sleep(self.delay)
+        return super().write(text)
+
+
+def direct_logger(name: str, stream: SlowStream) -> logging.Logger:
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(
+        logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    )
+    logger.addHandler(handler)
+    return logger
+
+
+def queued_logger(name: str, stream: SlowStream, json_format: bool) -> AppLogger:
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    app_logger = AppLogger(name=name, json_format=json_format)
+    # Point the listener's console handler at the slow stream.
+    for handler in app_logger.listener.handlers:
+        handler.setStream(stream)
+    return app_logger
+
+
+async def run(logger: logging.Logger, args) -> dict:
+    lags = []
+    log_calls = []
+    stop = asyncio.Event()
+
+    async def probe():
+        interval = args.probe_ms / 1000
+        while not stop.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            lags.append(time.perf_counter() - started - interval)
+
+    async def handler(index):
+        for line in range(args.lines):
+            started = time.perf_counter()
+            logger.info("Handled request %d line %d", index, line)
+            log_calls.append(time.perf_counter() - started)
+            await asyncio.sleep(0)
+
+    probe_task = asyncio.ensure_future(probe())
+    started = time.perf_counter()
+    await asyncio.gather(*(handler(index) for index in range(args.handlers)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe_task
+
+    lags.sort()
+    return {
+        "elapsed_s": elapsed,
+        "log_call_mean_ms": statistics.mean(log_calls) * 1000,
+        "loop_lag_p99_ms": lags[min(len(lags) - 1, int(len(lags) * 0.99))] * 1000,
+        "loop_lag_max_ms": lags[-1] * 1000,
+    }
+
+
+def report(name: str, result: dict) -> None:
+    print(
+        f"{name:<8} handlers done in {result['elapsed_s']:6.2f}s"
+        f"  log call {result['log_call_mean_ms']:7.3f} ms"
+        f"  loop lag p99 {result['loop_lag_p99_ms']:7.2f} ms"
+        f"  max {result['loop_lag_max_ms']:7.2f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--write-ms", type=float, default=2.0)
+    parser.add_argument("--handlers", type=int, default=20)
+    parser.add_argument("--lines", type=int, default=25)
+    parser.add_argument("--probe-ms", type=float, default=1.0)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    stream = SlowStream(args.write_ms / 1000)
+    report("direct", asyncio.run(run(direct_logger("bench.direct", stream), args)))
+
+    stream = SlowStream(args.write_ms / 1000)
+    app_logger = queued_logger("bench.queued", stream, args.json)
+    report("queued", asyncio.run(run(app_logger.get_logger(), args)))
+
+    started = time.perf_counter()
+    app_logger.stop()
+    print(f"queued   listener drained the backlog in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
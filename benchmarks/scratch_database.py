@@ -0,0 +1,53 @@
+"""
+Points the application at scratch state for benchmarks that write to the
+database. Import it before any ``app`` module.
+
+Without ``DATABASE_URL`` in the environment, a temporary SQLite database
+is used and deleted at exit. The serving snapshot and popularity file go
+to a temporary directory either way. Worker processes inherit the
+environment, so they share the parent's state instead of creating their
+own.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+
+if "CARVALUE_BENCH_DIR" not in os.environ:
+    _directory = tempfile.mkdtemp(prefix="carvalue-bench-")
+    os.environ["CARVALUE_BENCH_DIR"] = _directory
+    os.environ.setdefault(
+        "DATABASE_URL", f"sqlite:///{os.path.join(_directory, 'bench.db')}"
+    )
+    os.environ["SERVING_SNAPSHOT_DIR"] = os.path.join(_directory, "serving")
+    os.environ["POPULAR_SEGMENTS_PATH"] = os.path.join(_directory, "popular.json")
+    atexit.register(shutil.rmtree, _directory, ignore_errors=True)
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import delete
+
+from app.core.database.session import async_session_factory
+from app.models.partitioning import vehicle_partitioning
+
+
+def migrate() -> None:
+    """
+    Upgrades the database to the latest revision.
+    """
+    alembic_config = Config()
+    alembic_config.set_main_option(
+        "script_location",
+        os.path.join(os.path.dirname(os.path.dirname(__file__)), "migrations"),
+    )
+    command.upgrade(alembic_config, "head")
+
+
+async def clear_vehicles() -> None:
+    """
+    Deletes every vehicle, partition by partition.
+    """
+    async with async_session_factory() as db_session:
+        for name in vehicle_partitioning.names:
+            await db_session.execute(delete(vehicle_partitioning.table(name)))
+        await db_session.commit()
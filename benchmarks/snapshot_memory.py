@@ -0,0 +1,153 @@
+"""
+Per-worker memory of the serving data, attached from the shared mmap
+snapshot versus loaded into each worker's own heap.
+
+Sketches and comparable listings for a synthetic inventory are published
+as a snapshot in a temporary directory. N worker processes then either
+attach the snapshot, as server workers do, or unpickle a private copy of
+the same quantile store. Each worker reads every sketch so that its pages
+are resident, waits until all workers are up and reports its RSS and PSS
+from ``/proc``, less what it used before loading the data. PSS divides
+shared pages between the processes mapping them, so it shows what each
+worker really costs. Linux only.
+
+Usage: python -m benchmarks.snapshot_memory [--rows N] [--workers 1 4 8]
+"""
+import argparse
+import multiprocessing
+import os
+import pickle
+import tempfile
+from typing import Dict, Optional
+
+from app.integration.comparables import ComparableTablesBuilder
+from app.integration.quantile_sketch import SegmentQuantileStore
+from app.integration.serving_snapshot import (
+    ServingSnapshotManager,
+    SnapshotQuantileStore,
+)
+
+
+def memory_kb(mapping: Optional[str] = None) -> Dict[str, int]:
+    """
+    Returns the process's RSS and PSS in kB, or those of the mappings of
+    one file if ``mapping`` is given.
+    """
+    fields = {"Rss": 0, "Pss": 0}
+    path = "/proc/self/smaps" if mapping else "/proc/self/smaps_rollup"
+    selected = mapping is None
+    with open(path) as smaps:
+        for line in smaps:
+            name = line.split(":", 1)[0]
+            if mapping and "-" in name and " " in line:
+                # A mapping header: "start-end perms offset dev inode path".
+                selected = line.rstrip().endswith(mapping)
+            elif selected and name in fields:
+                fields[name] += int(line.split()[1])
+    return fields
+
+
+def touch_segments(store, segments) -> None:
+    for year, make, model in segments:
+        store.get_sketch(year, make, model)
+
+
+def worker(mode: str, directory: str, segments, barrier, results) -> None:
+    before = memory_kb()
+    if mode == "snapshot":
+        manager = ServingSnapshotManager(directory)
+        store = SnapshotQuantileStore(manager)
+        mapping = os.path.basename(manager._path(manager.current().generation))
+    else:
+        with open(os.path.join(directory, "store.pickle"), "rb") as store_file:
+            store = pickle.load(store_file)
+        mapping = None
+
+    touch_segments(store, segments)
+    barrier.wait()
+    usage = {name: kb - before[name] for name, kb in memory_kb().items()}
+    if mapping:
+        usage["snapshot_pss"] = memory_kb(mapping)["Pss"]
+    results.put(usage)
+    # Stay attached until every worker has measured.
+    barrier.wait()
+
+
+def publish(directory: str, rows: int):
+    # Only the parent generates listings; workers skip the heavy imports.
+    from benchmarks.estimator_backends import synthetic_listings
+
+    df = synthetic_listings(rows)
+    price_rows = list(
+        df[["make", "model", "year", "listing_mileage", "listing_price"]]
+        .itertuples(index=False, name=None)
+    )
+    store = SegmentQuantileStore()
+    store.add_rows(price_rows)
+    comparables = ComparableTablesBuilder()
+    comparables.add_rows(price_rows)
+
+    manager = ServingSnapshotManager(directory)
+    generation = manager.publish(
+        store,
+        model_path=os.path.join(directory, "no-model.json"),
+        comparables=comparables,
+    )
+    with open(os.path.join(directory, "store.pickle"), "wb") as store_file:
+        pickle.dump(store, store_file)
+
+    segments = sorted({(year, make, model) for make, model, year, _, _ in price_rows})
+    size = os.path.getsize(manager._path(generation))
+    return segments, size
+
+
+def measure(mode: str, directory: str, segments, workers: int) -> list:
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    processes = [
+        context.Process(
+            target=worker, args=(mode, directory, segments, barrier, results)
+        )
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    usages = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return usages
+
+
+def report(mode: str, workers: int, usages: list) -> None:
+    rss = sum(usage["Rss"] for usage in usages) / len(usages) / 1024
+    pss = sum(usage["Pss"] for usage in usages) / len(usages) / 1024
+    line = (
+        f"{mode:<9} x{workers:<3} RSS {rss:8.1f} MB/worker"
+        f"  PSS {pss:8.1f} MB/worker  total PSS {pss * workers:8.1f} MB"
+    )
+    if "snapshot_pss" in usages[0]:
+        snapshot_pss = sum(usage["snapshot_pss"] for usage in usages) / len(usages)
+        line += f"  snapshot PSS {snapshot_pss / 1024:6.1f} MB/worker"
+    print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        segments, size = publish(directory, args.rows)
+        print(
+            f"{args.rows} listings, {len(segments)} segments,"
+            f" snapshot {size / 2**20:.1f} MB"
+        )
+        for workers in args.workers:
+            for mode in ("snapshot", "private"):
+                report(mode, workers, measure(mode, directory, segments, workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Trains each estimator backend and reports training cost and hold-out
+accuracy, so model variants can be compared run to run.
+
+For every backend the report records training wall time, peak traced
+memory, training rows per second, MAE and MAPE on the hold-out set
+(overall and per year/make/model segment) and inference throughput,
+both batched and one row at a time. Results are printed and written as
+JSON.
+
+The trained models are discarded unless ``--output`` names a directory
+to save them in, under the file names the server loads them from, so a
+run can also produce the models to deploy (``--output app``).
+
+Usage:
+    python -m benchmarks.train_evaluate --data-file data/listings.txt
+    python -m benchmarks.train_evaluate --synthetic-rows 200000 --backend gbm
+    python -m benchmarks.train_evaluate --data-file data/listings.txt --output app
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+from app.integration.estimators import ESTIMATOR_BACKENDS, create_estimator
+from benchmarks.estimator_backends import synthetic_listings
+
+SEGMENT_COLUMNS = ["year", "make", "model"]
+
+
+def segment_metrics(df, X_test, y_test, predictions, min_rows, top):
+    """
+    MAE and MAPE per year/make/model segment on the hold-out rows, for the
+    ``top`` segments with the most hold-out rows (at least ``min_rows``).
+    """
+    holdout = df.loc[X_test.index, SEGMENT_COLUMNS].copy()
+    holdout["actual"] = y_test.to_numpy(dtype=float)
+    holdout["error"] = np.abs(predictions - holdout["actual"])
+    holdout["pct_error"] = np.where(
+        holdout["actual"] != 0,
+        holdout["error"] / holdout["actual"].where(holdout["actual"] != 0),
+        np.nan,
+    )
+
+    grouped = holdout.groupby(SEGMENT_COLUMNS).agg(
+        rows=("error", "size"), mae=("error", "mean"), mape=("pct_error", "mean")
+    )
+    grouped = grouped[grouped["rows"] >= min_rows]
+    grouped = grouped.sort_values("rows", ascending=False).head(top)
+
+    return [
+        {
+            "segment": f"{year}|{make}|{model}",
+            "rows": int(row.rows),
+            "mae": float(row.mae),
+            "mape": None if np.isnan(row.mape) else float(row.mape),
+        }
+        for (year, make, model), row in grouped.iterrows()
+    ]
+
+
+def inference_throughput(estimator, rows, single_rows):
+    started = time.perf_counter()
+    estimator.predict_many(rows)
+    batched = len(rows) / (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for row in rows[:single_rows]:
+        estimator.predict_price(*row)
+    single = min(len(rows), single_rows) / (time.perf_counter() - started)
+
+    return {"batched_rows_per_s": batched, "single_rows_per_s": single}
+
+
+def bench_backend(backend, df, args, directory):
+    model_name = os.path.basename(create_estimator(backend).model_path)
+    estimator = create_estimator(backend, os.path.join(directory, model_name))
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    X_test, y_test = estimator.train_from_dataframe(df, test_size=args.test_size)
+    train_seconds = time.perf_counter() - started
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    train_rows = len(df) - len(X_test)
+    if args.output:
+        estimator.save_model()
+    predictions = estimator.predict_features(X_test)
+    holdout = df.loc[X_test.index]
+    rows = list(
+        zip(
+            holdout["listing_mileage"].tolist(),
+            holdout["year"].tolist(),
+            holdout["make"].tolist(),
+            holdout["model"].tolist(),
+        )
+    )
+
+    return {
+        "train_seconds": train_seconds,
+        "train_rows": train_rows,
+        "train_rows_per_s": train_rows / train_seconds,
+        "peak_traced_memory_mb": peak_bytes / 2**20,
+        "holdout": estimator.evaluate(X_test, y_test),
+        "segments": segment_metrics(
+            df, X_test, y_test, predictions, args.min_segment_rows, args.top_segments
+        ),
+        "inference": inference_throughput(estimator, rows, args.single_rows),
+        "model_path": estimator.model_path if args.output else None,
+    }
+
+
+def report(backend, result):
+    holdout = result["holdout"]
+    inference = result["inference"]
+    # MAPE is undefined when every hold-out price is zero.
+    mape = "n/a" if holdout["mape"] is None else f"{holdout['mape']:.1%}"
+    print(
+        f"{backend:<7} train {result['train_seconds']:7.2f}s"
+        f"  {result['train_rows_per_s']:10.0f} rows/s"
+        f"  peak {result['peak_traced_memory_mb']:7.1f} MB"
+        f"  MAE {holdout['mae']:9.1f}  MAPE {mape:>6}"
+        f"  predict {inference['batched_rows_per_s']:10.0f} rows/s batched"
+        f"  {inference['single_rows_per_s']:8.0f} rows/s single"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--data-file", help="pipe-delimited inventory snapshot")
+    source.add_argument("--synthetic-rows", type=int)
+    parser.add_argument(
+        "--backend",
+        action="append",
+        choices=list(ESTIMATOR_BACKENDS),
+        help="backend to train, repeatable (default: all)",
+    )
+    parser.add_argument("--test-size", type=float, default=0.1)
+    parser.add_argument("--min-segment-rows", type=int, default=20)
+    parser.add_argument("--top-segments", type=int, default=50)
+    parser.add_argument("--single-rows", type=int, default=1000)
+    parser.add_argument("--report", default="training_report.json")
+    parser.add_argument(
+        "--output", help="directory to save the trained models in (default: discard)"
+    )
+    args = parser.parse_args()
+
+    backends = args.backend or list(ESTIMATOR_BACKENDS)
+    if args.data_file:
+        df = create_estimator(backends[0])._load_and_clean_data(args.data_file)
+    else:
+        df = synthetic_listings(args.synthetic_rows)
+    df = df.reset_index(drop=True)
+
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        for backend in backends:
+            results[backend] = bench_backend(
+                backend, df, args, args.output or scratch
+            )
+            report(backend, results[backend])
+            if args.output:
+                print(f"Model saved to {results[backend]['model_path']}")
+
+    with open(args.report, "w") as json_file:
+        json.dump(
+            {
+                "generated_at": datetime.now(timezone.utc).isoformat(),
+                "data_file": args.data_file,
+                "synthetic_rows": args.synthetic_rows,
+                "rows": len(df),
+                "test_size": args.test_size,
+                "python": platform.python_version(),
+                "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                / 1024,
+                "backends": results,
+            },
+            json_file,
+            indent=2,
+        )
+    print(f"Report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
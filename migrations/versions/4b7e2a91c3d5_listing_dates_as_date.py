@@ -0,0 +1,48 @@
+"""listing dates as date
+
+Revision ID: 4b7e2a91c3d5
+Revises: dc00357dbd26
+Create Date: 2026-10-19 09:12:44.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b7e2a91c3d5'
+down_revision: Union[str, None] = 'dc00357dbd26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+DATE_COLUMNS = ('first_seen_date', 'last_seen_date', 'dealer_vdp_last_seen_date')
+
+
+def upgrade() -> None:
+    for column in DATE_COLUMNS:
+        op.execute(
+            f"UPDATE vehicles SET {column} = NULL WHERE {column} = ''"
+        )
+    # Batch mode recreates the table on SQLite, which cannot ALTER COLUMN.
+    with op.batch_alter_table('vehicles') as batch_op:
+        for column in DATE_COLUMNS:
+            batch_op.alter_column(column,
+                   existing_type=sa.String(length=500),
+                   type_=sa.Date(),
+                   existing_nullable=True)
+    op.create_index('ix_vehicle_first_seen_date', 'vehicles', ['first_seen_date'], unique=False)
+    op.create_index('ix_vehicle_last_seen_date', 'vehicles', ['last_seen_date'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_vehicle_last_seen_date', table_name='vehicles')
+    op.drop_index('ix_vehicle_first_seen_date', table_name='vehicles')
+    with op.batch_alter_table('vehicles') as batch_op:
+        for column in DATE_COLUMNS:
+            batch_op.alter_column(column,
+                   existing_type=sa.Date(),
+                   type_=sa.String(length=500),
+                   existing_nullable=True)
@@ -0,0 +1,83 @@
+"""regional estimate indexes
+
+Revision ID: 9e3f6c0d2a17
+Revises: 4b7e2a91c3d5
+Create Date: 2026-10-19 11:40:05.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e3f6c0d2a17'
+down_revision: Union[str, None] = '4b7e2a91c3d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _backfill_dealer_zip() -> None:
+    # The old loader read ZIP codes as floats, storing "78701.0" and
+    # "2134.0" for 02134. Restore five-digit codes before the column is
+    # narrowed, so the segment index and radius lookups match them.
+    if op.get_bind().dialect.name == 'mysql':
+        pad = "LPAD(dealer_zip, 5, '0')"
+    else:
+        pad = "SUBSTR('00000' || dealer_zip, -5)"
+
+    op.execute("UPDATE vehicles SET dealer_zip = NULL WHERE TRIM(dealer_zip) = ''")
+    op.execute(
+        "UPDATE vehicles SET dealer_zip = "
+        "SUBSTR(TRIM(dealer_zip), 1, INSTR(TRIM(dealer_zip), '.') - 1) "
+        "WHERE INSTR(dealer_zip, '.') > 0"
+    )
+    op.execute(
+        f"UPDATE vehicles SET dealer_zip = {pad} "
+        "WHERE dealer_zip <> '' AND LENGTH(dealer_zip) < 5"
+    )
+    op.execute(
+        "UPDATE vehicles SET dealer_zip = SUBSTR(dealer_zip, 1, 5) "
+        "WHERE LENGTH(dealer_zip) > 10"
+    )
+
+
+def upgrade() -> None:
+    op.create_table('zip_centroids',
+    sa.Column('zip_code', sa.String(length=10), nullable=False),
+    sa.Column('latitude', sa.Float(), nullable=False),
+    sa.Column('longitude', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('zip_code')
+    )
+    op.create_index('ix_zip_centroid_lat_lon', 'zip_centroids', ['latitude', 'longitude'], unique=False)
+
+    _backfill_dealer_zip()
+    with op.batch_alter_table('vehicles') as batch_op:
+        batch_op.alter_column('dealer_state',
+                   existing_type=sa.String(length=500),
+                   type_=sa.String(length=50),
+                   existing_nullable=True)
+        batch_op.alter_column('dealer_zip',
+                   existing_type=sa.String(length=500),
+                   type_=sa.String(length=10),
+                   existing_nullable=True)
+    op.create_index('ix_vehicle_segment_state', 'vehicles', ['make', 'model', 'year', 'dealer_state'], unique=False)
+    op.create_index('ix_vehicle_segment_zip', 'vehicles', ['make', 'model', 'year', 'dealer_zip'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_vehicle_segment_zip', table_name='vehicles')
+    op.drop_index('ix_vehicle_segment_state', table_name='vehicles')
+    with op.batch_alter_table('vehicles') as batch_op:
+        batch_op.alter_column('dealer_zip',
+                   existing_type=sa.String(length=10),
+                   type_=sa.String(length=500),
+                   existing_nullable=True)
+        batch_op.alter_column('dealer_state',
+                   existing_type=sa.String(length=50),
+                   type_=sa.String(length=500),
+                   existing_nullable=True)
+
+    op.drop_index('ix_zip_centroid_lat_lon', table_name='zip_centroids')
+    op.drop_table('zip_centroids')
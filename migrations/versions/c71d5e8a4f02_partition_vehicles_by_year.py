@@ -0,0 +1,56 @@
+"""partition vehicles by year
+
+Revision ID: c71d5e8a4f02
+Revises: 9e3f6c0d2a17
+Create Date: 2026-10-19 14:05:31.640918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.models.partitioning import vehicle_partitioning
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c71d5e8a4f02'
+down_revision: Union[str, None] = '9e3f6c0d2a17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'mysql':
+        vehicle_partitioning.create_emulated(bind)
+        return
+
+    # The partitioning column must be NOT NULL and part of every unique key.
+    op.execute("UPDATE vehicles SET year = 0 WHERE year IS NULL")
+    op.alter_column('vehicles', 'year',
+               existing_type=sa.Integer(),
+               nullable=False,
+               server_default=sa.text('0'))
+    op.execute(
+        "ALTER TABLE vehicles DROP PRIMARY KEY, ADD PRIMARY KEY (id, year)"
+    )
+    op.drop_constraint('vin', 'vehicles', type_='unique')
+    op.create_unique_constraint('uq_vehicle_vin_year', 'vehicles', ['vin', 'year'])
+    op.execute(f"ALTER TABLE vehicles {vehicle_partitioning.mysql_clause()}")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'mysql':
+        vehicle_partitioning.drop_emulated(bind)
+        return
+
+    op.execute("ALTER TABLE vehicles REMOVE PARTITIONING")
+    op.drop_constraint('uq_vehicle_vin_year', 'vehicles', type_='unique')
+    op.create_unique_constraint('vin', 'vehicles', ['vin'])
+    op.execute("ALTER TABLE vehicles DROP PRIMARY KEY, ADD PRIMARY KEY (id)")
+    op.alter_column('vehicles', 'year',
+               existing_type=sa.Integer(),
+               nullable=True,
+               server_default=None)
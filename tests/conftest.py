@@ -0,0 +1,29 @@
+import os
+import tempfile
+
+# Point the application at throwaway state before any app module reads
+# its configuration: an SQLite database (with emulated partitions), an
+# empty serving snapshot directory and a scratch popularity file.
+_state_dir = tempfile.mkdtemp(prefix="carvalue-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_state_dir, 'carvalue.db')}"
+os.environ["SERVING_SNAPSHOT_DIR"] = os.path.join(_state_dir, "serving")
+os.environ["POPULAR_SEGMENTS_PATH"] = os.path.join(_state_dir, "popular_segments.json")
+
+import pytest
+from alembic import command
+from alembic.config import Config
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "migrations")
+
+
+@pytest.fixture(scope="module")
+def migrated_database():
+    """
+    Upgrades the test database to head for the module's tests and
+    downgrades it to base afterwards, leaving it empty for the next module.
+    """
+    alembic_config = Config()
+    alembic_config.set_main_option("script_location", MIGRATIONS_DIR)
+    command.upgrade(alembic_config, "head")
+    yield
+    command.downgrade(alembic_config, "base")
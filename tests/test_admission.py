@@ -0,0 +1,161 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.core.exceptions import ServiceUnavailableException
+from app.core.server import init_listeners
+from app.utils.admission import (
+    PRIORITY_HIGH,
+    PRIORITY_LOW,
+    PRIORITY_NORMAL,
+    AdmissionController,
+)
+
+
+def controller(**kwargs) -> AdmissionController:
+    options = {"max_concurrency": 1, "max_queue": 1, "queue_timeout": 5.0}
+    return AdmissionController(name="test", **{**options, **kwargs})
+
+
+async def hold(limiter: AdmissionController, release: asyncio.Event, priority):
+    async with limiter.admit(priority):
+        await release.wait()
+
+
+async def settle() -> None:
+    # Let every ready task run up to its next wait.
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_higher_priority_arrival_displaces_the_worst_waiter():
+    async def scenario():
+        limiter = controller()
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(hold(limiter, release, PRIORITY_NORMAL))
+        await settle()
+        low = asyncio.ensure_future(hold(limiter, release, PRIORITY_LOW))
+        await settle()
+        high = asyncio.ensure_future(hold(limiter, release, PRIORITY_HIGH))
+        await settle()
+
+        with pytest.raises(ServiceUnavailableException) as displaced:
+            await low
+        # An arrival no better than the waiters is turned away instead.
+        with pytest.raises(ServiceUnavailableException) as rejected:
+            await hold(limiter, release, PRIORITY_HIGH)
+
+        release.set()
+        await asyncio.gather(holder, high)
+        return displaced.value, rejected.value, limiter.stats()
+
+    displaced, rejected, stats = asyncio.run(scenario())
+
+    assert "displaced" in displaced.detail
+    assert "queue full" in rejected.detail
+    assert stats["admitted"] == 2
+    assert stats["rejected"] == 2
+    assert (stats["in_flight"], stats["queued"]) == (0, 0)
+
+
+def test_waiter_is_rejected_after_the_queue_timeout():
+    async def scenario():
+        limiter = controller(queue_timeout=0.01)
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(hold(limiter, release, PRIORITY_NORMAL))
+        await settle()
+
+        with pytest.raises(ServiceUnavailableException) as timed_out:
+            await hold(limiter, release, PRIORITY_NORMAL)
+        queued = limiter.stats()["queued"]
+
+        release.set()
+        await holder
+        return timed_out.value, queued, limiter.stats()
+
+    timed_out, queued, stats = asyncio.run(scenario())
+
+    assert "queue timeout" in timed_out.detail
+    assert queued == 0
+    assert stats["timed_out"] == 1
+    assert (stats["in_flight"], stats["queued"]) == (0, 0)
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    async def scenario():
+        limiter = controller()
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(hold(limiter, release, PRIORITY_NORMAL))
+        await settle()
+        waiter = asyncio.ensure_future(hold(limiter, release, PRIORITY_NORMAL))
+        await settle()
+
+        waiter.cancel()
+        await settle()
+        # The queue has room again.
+        replacement = asyncio.ensure_future(hold(limiter, release, PRIORITY_LOW))
+        await settle()
+        queued = limiter.stats()["queued"]
+
+        release.set()
+        await asyncio.gather(holder, replacement)
+        return waiter.cancelled(), queued, limiter.stats()
+
+    cancelled, queued, stats = asyncio.run(scenario())
+
+    assert cancelled
+    assert queued == 1
+    assert stats["admitted"] == 2
+    assert (stats["in_flight"], stats["queued"]) == (0, 0)
+
+
+def test_waiter_cancelled_after_the_handover_does_not_leak_the_slot():
+    async def scenario():
+        limiter = controller()
+        release = asyncio.Event()
+        waiter = None
+
+        async def hand_over_then_cancel():
+            async with limiter.admit():
+                await release.wait()
+            # The slot is now the waiter's, but it has not run yet.
+            waiter.cancel()
+
+        holder = asyncio.ensure_future(hand_over_then_cancel())
+        await settle()
+        waiter = asyncio.ensure_future(hold(limiter, release, PRIORITY_NORMAL))
+        await settle()
+
+        release.set()
+        await asyncio.gather(holder, waiter, return_exceptions=True)
+        return limiter.stats()
+
+    stats = asyncio.run(scenario())
+
+    assert (stats["in_flight"], stats["queued"]) == (0, 0)
+
+
+def test_rejection_is_a_503_with_retry_after():
+    app = FastAPI()
+    init_listeners(app)
+    limiter = controller(max_concurrency=0, max_queue=0, retry_after=7)
+
+    @app.get("/limited")
+    async def limited():
+        async with limiter.admit():
+            return {}
+
+    async def request():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            return await client.get("/limited")
+
+    response = asyncio.run(request())
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "7"
+    assert response.json()["detail"] == "test is saturated (queue full). Retry shortly."
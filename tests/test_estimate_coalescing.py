@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from app.controllers import EstimateController
+from app.controllers.estimate_controller import estimate_single_flight
+from app.models.estimate import Vehicle
+from app.schemas.requests.estimate import EstimateRequest
+from app.utils.result_cache import GenerationCache
+
+
+class CountingEstimateRepository:
+    """
+    Stands in for EstimateRepository: counts queries and holds each one
+    open long enough for concurrent requests to pile up behind it.
+    """
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.calls = 0
+
+    async def get_estimate(self, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return [
+            Vehicle(year=kwargs["year"], make="Honda", model="Civic", listing_price=price)
+            for price in (15000, 16000, 17000)
+        ]
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(
+        "app.controllers.estimate_controller.estimate_cache", GenerationCache()
+    )
+
+
+def controller(repository) -> EstimateController:
+    return EstimateController(
+        estimate_repository=repository, zip_centroid_repository=None
+    )
+
+
+async def concurrent_estimates(requests):
+    repository = CountingEstimateRepository()
+    estimates = await asyncio.gather(
+        *(controller(repository).get_estimate(request) for request in requests)
+    )
+    return repository, estimates
+
+
+def test_concurrent_identical_requests_run_one_query():
+    executions = estimate_single_flight.executions
+    request = EstimateRequest(year=2018, make="Honda", model="Civic")
+
+    repository, estimates = asyncio.run(concurrent_estimates([request] * 50))
+
+    assert repository.calls == 1
+    assert estimate_single_flight.executions - executions == 1
+    assert all(estimate == estimates[0] for estimate in estimates)
+    assert estimates[0].average_price == 16000
+
+
+def test_requests_differing_in_case_and_spacing_share_a_query():
+    spellings = [("Honda", "Civic"), ("honda ", "civic"), (" HONDA", "Civic ")]
+    requests = [
+        EstimateRequest(year=2018, make=make, model=model)
+        for make, model in spellings * 10
+    ]
+
+    repository, _ = asyncio.run(concurrent_estimates(requests))
+
+    assert repository.calls == 1
+
+
+def test_different_requests_are_not_coalesced():
+    requests = [
+        EstimateRequest(year=year, make="Honda", model="Civic")
+        for year in (2016, 2017, 2018)
+        for _ in range(10)
+    ]
+
+    repository, _ = asyncio.run(concurrent_estimates(requests))
+
+    assert repository.calls == 3
@@ -0,0 +1,206 @@
+import os
+
+import pandas as pd
+import pytest
+from sqlalchemy import delete, select
+
+from app.core.database.session import async_session_factory
+from app.integration.ingest import apply_delta, publish_serving_data
+from app.integration.serving_snapshot import ServingSnapshotManager
+from app.models.estimate import Vehicle
+from app.models.partitioning import vehicle_partitioning
+from app.repositories import VehicleRepository
+from app.repositories.filters import DELISTED_STATUS
+from tests.utils import run
+
+pytestmark = pytest.mark.usefixtures("migrated_database")
+
+COLUMNS = ["vin", "year", "make", "model", "listing_price", "listing_mileage"]
+LISTINGS = [
+    ("V1", 2012, "Honda", "Civic", 10000, 90000),
+    ("V2", 2012, "Honda", "Civic", 11000, 80000),
+    ("V3", 2015, "Toyota", "Camry", 14000, 60000),
+    ("V4", 2015, "Toyota", "Camry", 15000, None),
+    ("V5", 2018, "Ford", "Focus", 13000, 30000),
+]
+
+
+@pytest.fixture(autouse=True)
+def empty_vehicles():
+    async def clear():
+        async with async_session_factory() as db_session:
+            for name in vehicle_partitioning.names:
+                await db_session.execute(delete(vehicle_partitioning.table(name)))
+            await db_session.commit()
+
+    run(clear())
+
+
+@pytest.fixture
+def snapshot_manager(tmp_path, monkeypatch):
+    manager = ServingSnapshotManager(
+        directory=os.path.join(tmp_path, "serving"), refresh_interval=0
+    )
+    monkeypatch.setattr("app.integration.ingest.serving_snapshot", manager)
+    return manager
+
+
+def write_snapshot(directory, name: str, listings) -> str:
+    df = pd.DataFrame(listings, columns=COLUMNS)
+    df["dealer_state"] = "TX"
+    df["last_seen_date"] = "2022-08-17"
+    path = os.path.join(directory, f"{name}.txt")
+    df.to_csv(path, sep="|", index=False)
+    return path
+
+
+def published_tables(snapshot) -> dict:
+    return {
+        name: [
+            (table[index], list(table.values(index)) if "values" in meta else None)
+            for index in range(len(table))
+        ]
+        for name, meta in snapshot.metadata["tables"].items()
+        for table in [snapshot.table(name)]
+    }
+
+
+async def apply(path: str) -> dict:
+    async with async_session_factory() as db_session:
+        return await apply_delta(db_session, path)
+
+
+async def stored_rows() -> dict:
+    """
+    Returns ``(partition, year, price, status)`` for each stored VIN, in a
+    list so that a VIN stored twice shows up.
+    """
+    rows = {}
+    async with async_session_factory() as db_session:
+        for name in vehicle_partitioning.names:
+            table = vehicle_partitioning.table(name)
+            result = await db_session.execute(
+                select(
+                    table.c.vin,
+                    table.c.year,
+                    table.c.listing_price,
+                    table.c.listing_status,
+                )
+            )
+            for vin, year, price, status in result.all():
+                rows.setdefault(vin, []).append((name, year, price, status))
+    return rows
+
+
+def test_delta_inserts_updates_keeps_and_delists(tmp_path, snapshot_manager):
+    delta = [
+        ("V1", 2012, "Honda", "Civic", 9500, 90000),
+        *LISTINGS[1:2],
+        *LISTINGS[3:],
+        ("V6", 2020, "Kia", "Soul", 17000, 20000),
+    ]
+
+    async def scenario():
+        first = await apply(write_snapshot(tmp_path, "day1", LISTINGS))
+        second = await apply(write_snapshot(tmp_path, "day2", delta))
+        return first, second, await stored_rows()
+
+    first, second, rows = run(scenario())
+
+    assert first == {"inserted": 5, "updated": 0, "unchanged": 0, "delisted": 0}
+    assert second == {"inserted": 1, "updated": 1, "unchanged": 3, "delisted": 1}
+    assert {vin: [row[1:] for row in stored] for vin, stored in rows.items()} == {
+        "V1": [(2012, 9500, None)],
+        "V2": [(2012, 11000, None)],
+        "V3": [(2015, 14000, DELISTED_STATUS)],
+        "V4": [(2015, 15000, None)],
+        "V5": [(2018, 13000, None)],
+        "V6": [(2020, 17000, None)],
+    }
+
+
+def test_delisted_vin_that_returns_is_listed_again(tmp_path, snapshot_manager):
+    async def scenario():
+        await apply(write_snapshot(tmp_path, "day1", LISTINGS))
+        await apply(write_snapshot(tmp_path, "day2", LISTINGS[:2] + LISTINGS[3:]))
+        stats = await apply(write_snapshot(tmp_path, "day3", LISTINGS))
+        async with async_session_factory() as db_session:
+            active_vins = await VehicleRepository(
+                model=Vehicle, db_session=db_session
+            ).get_active_vins()
+        return stats, active_vins, await stored_rows()
+
+    stats, active_vins, rows = run(scenario())
+
+    assert stats == {"inserted": 0, "updated": 1, "unchanged": 4, "delisted": 0}
+    assert active_vins == {"V1", "V2", "V3", "V4", "V5"}
+    assert [row[1:] for row in rows["V3"]] == [(2015, 14000, None)]
+
+
+def test_year_change_moves_the_listing_to_its_new_partition(
+    tmp_path, snapshot_manager
+):
+    corrected = ("V5", 2012, "Ford", "Focus", 13000, 30000)
+
+    async def scenario():
+        await apply(write_snapshot(tmp_path, "day1", LISTINGS))
+        stats = await apply(
+            write_snapshot(tmp_path, "day2", LISTINGS[:4] + [corrected])
+        )
+        return stats, await stored_rows()
+
+    stats, rows = run(scenario())
+
+    assert stats == {"inserted": 0, "updated": 1, "unchanged": 4, "delisted": 0}
+    assert rows["V5"] == [
+        (vehicle_partitioning.partition_for(2012), 2012, 13000, None)
+    ]
+
+
+def test_delta_publish_rebuilds_only_changed_makes(
+    tmp_path, snapshot_manager, monkeypatch
+):
+    # V1 is repriced, V3 delisted and V6 listed: Honda, Toyota and Kia change.
+    delta = [
+        ("V1", 2012, "Honda", "Civic", 9500, 90000),
+        *LISTINGS[1:2],
+        *LISTINGS[3:],
+        ("V6", 2020, "Kia", "Soul", 17000, 20000),
+    ]
+    read_makes = []
+    iter_price_rows = VehicleRepository.iter_price_rows
+
+    def recording_iter_price_rows(self, makes=None, **kwargs):
+        read_makes.append(makes)
+        return iter_price_rows(self, makes=makes, **kwargs)
+
+    monkeypatch.setattr(
+        VehicleRepository, "iter_price_rows", recording_iter_price_rows
+    )
+
+    async def scenario():
+        await apply(write_snapshot(tmp_path, "day1", LISTINGS))
+        stats = await apply(write_snapshot(tmp_path, "day2", delta))
+        incremental = published_tables(snapshot_manager.current())
+
+        async with async_session_factory() as db_session:
+            await publish_serving_data(db_session)
+        return stats, incremental, published_tables(snapshot_manager.current())
+
+    stats, incremental, rebuilt = run(scenario())
+
+    assert stats == {"inserted": 1, "updated": 1, "unchanged": 3, "delisted": 1}
+    assert read_makes[1] == {"honda", "toyota", "kia"}
+    assert incremental == rebuilt
+    # V4, the only active Toyota, has no mileage to compare on.
+    assert [key for key, _ in incremental["comparables"]] == [
+        b"ford",
+        b"honda",
+        b"kia",
+    ]
+    assert dict(incremental["segment_counts"]) == {
+        b"2012|honda|civic": [2.0],
+        b"2015|toyota|camry": [1.0],
+        b"2018|ford|focus": [1.0],
+        b"2020|kia|soul": [1.0],
+    }
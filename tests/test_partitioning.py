@@ -0,0 +1,107 @@
+import pytest
+from sqlalchemy import inspect, select, text
+
+from app.core.config import config
+from app.core.database.session import async_session_factory, engine
+from app.models.estimate import UNKNOWN_YEAR, Vehicle
+from app.models.partitioning import vehicle_partitioning
+from app.repositories import EstimateRepository, VehicleRepository
+from tests.utils import run
+
+pytestmark = pytest.mark.usefixtures("migrated_database")
+
+LISTINGS = [
+    ("V1", 2012, "Honda", "Civic", 10000, 90000),
+    ("V2", 2012, "Honda", "Civic", 11000, 80000),
+    ("V3", 2012, "Honda", "Civic", 12000, 70000),
+    ("V4", 2023, "Honda", "Civic", 25000, 10000),
+    ("V5", UNKNOWN_YEAR, "Honda", "Civic", 9000, 120000),
+]
+
+
+def test_sqlite_partitions_are_emulated():
+    assert vehicle_partitioning.emulated, config.DATABASE_URL
+
+
+async def load_listings() -> None:
+    async with async_session_factory() as db_session:
+        await VehicleRepository(model=Vehicle, db_session=db_session).insert_many(
+            [
+                {
+                    "vin": vin,
+                    "year": year,
+                    "make": make,
+                    "model": model,
+                    "listing_price": price,
+                    "listing_mileage": mileage,
+                    "dealer_state": "TX",
+                }
+                for vin, year, make, model, price, mileage in LISTINGS
+            ]
+        )
+        await db_session.commit()
+
+
+def test_migrations_create_partition_tables_behind_a_view():
+    async def inspect_schema():
+        async with engine.connect() as connection:
+            return await connection.run_sync(
+                lambda sync: (
+                    inspect(sync).get_table_names(),
+                    inspect(sync).get_view_names(),
+                )
+            )
+
+    tables, views = run(inspect_schema())
+
+    assert views == [Vehicle.__tablename__]
+    for name in vehicle_partitioning.names:
+        assert f"{Vehicle.__tablename__}_{name}" in tables
+
+
+def test_insert_update_delist_and_estimate_through_partitions():
+    async def scenario():
+        await load_listings()
+        async with async_session_factory() as db_session:
+            vehicle_repo = VehicleRepository(model=Vehicle, db_session=db_session)
+            await vehicle_repo.update_by_vins(["V2"], {"listing_price": 11500}, [2012])
+            await vehicle_repo.mark_delisted(["V3"])
+            await db_session.commit()
+
+            partition_vins = {}
+            for name in vehicle_partitioning.names:
+                table = vehicle_partitioning.table(name)
+                result = await db_session.execute(select(table.c.vin))
+                partition_vins[name] = sorted(result.scalars().all())
+            view_count = await db_session.execute(
+                text(f"SELECT COUNT(*) FROM {Vehicle.__tablename__}")
+            )
+
+            estimate = await EstimateRepository(
+                model=Vehicle, db_session=db_session
+            ).get_estimate(year=2012, make="honda", model="civic", listing_mileage=0)
+            return (
+                partition_vins,
+                view_count.scalar(),
+                estimate,
+                await vehicle_repo.get_active_vins(),
+                [
+                    row
+                    async for rows in vehicle_repo.iter_price_rows()
+                    for row in rows
+                ],
+            )
+
+    partition_vins, view_count, estimate, active_vins, price_rows = run(scenario())
+
+    assert partition_vins[vehicle_partitioning.partition_for(2012)] == ["V1", "V2", "V3"]
+    assert partition_vins[vehicle_partitioning.partition_for(2023)] == ["V4"]
+    assert partition_vins[vehicle_partitioning.partition_for(UNKNOWN_YEAR)] == ["V5"]
+    assert view_count == len(LISTINGS)
+
+    assert {(vehicle.vin, vehicle.listing_price) for vehicle in estimate} == {
+        ("V1", 10000),
+        ("V2", 11500),
+    }
+    assert active_vins == {"V1", "V2", "V4", "V5"}
+    assert sorted(row[2] for row in price_rows) == [2012, 2012, 2023]
@@ -0,0 +1,93 @@
+import bisect
+import random
+
+import pytest
+
+from app.integration.quantile_sketch import KLLSketch, SegmentQuantileStore
+
+QUANTILES = [0.01, 0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99]
+MAX_RANK_ERROR = 0.01
+
+
+def synthetic_prices(count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    return [round(rng.lognormvariate(10, 0.4), 2) for _ in range(count)]
+
+
+def rank_error(values: list, estimate: float, q: float) -> float:
+    """
+    Distance between ``q`` and the range of ranks ``estimate`` holds in the
+    exact data, so ties are not counted as error.
+    """
+    low = bisect.bisect_left(values, estimate) / len(values)
+    high = bisect.bisect_right(values, estimate) / len(values)
+    if low <= q <= high:
+        return 0.0
+    return min(abs(q - low), abs(q - high))
+
+
+def assert_rank_error(sketch: KLLSketch, values: list) -> None:
+    exact = sorted(values)
+    assert sketch.count == len(values)
+    for q in QUANTILES:
+        assert rank_error(exact, sketch.quantile(q), q) <= MAX_RANK_ERROR, q
+
+
+@pytest.mark.parametrize("count", [1000, 100000])
+def test_single_sketch_rank_error(count):
+    values = synthetic_prices(count, seed=count)
+    sketch = KLLSketch()
+    sketch.update_many(values)
+
+    assert_rank_error(sketch, values)
+
+
+def test_merged_sketch_rank_error():
+    shards = [synthetic_prices(20000 + 5000 * index, seed=index) for index in range(8)]
+    merged = KLLSketch()
+    for values in shards:
+        sketch = KLLSketch()
+        sketch.update_many(values)
+        merged.merge(sketch)
+
+    assert_rank_error(merged, [value for values in shards for value in values])
+
+
+def test_merged_sketch_survives_serialization():
+    values = synthetic_prices(50000, seed=42)
+    left, right = KLLSketch(), KLLSketch()
+    left.update_many(values[::2])
+    right.update_many(values[1::2])
+
+    merged = KLLSketch.from_dict(left.to_dict()).merge(
+        KLLSketch.from_weighted(right.weighted_items())
+    )
+
+    assert_rank_error(merged, values)
+
+
+def test_segment_store_merges_mileage_buckets():
+    rng = random.Random(7)
+    records = [
+        {
+            "year": 2018,
+            "make": "Honda",
+            "model": "Civic",
+            "listing_mileage": rng.randint(0, 120000),
+            "listing_price": price,
+        }
+        for price in synthetic_prices(30000, seed=7)
+    ]
+    store = SegmentQuantileStore()
+    store.add_records(records)
+
+    assert_rank_error(
+        store.get_sketch(2018, "Honda", "Civic"),
+        [record["listing_price"] for record in records],
+    )
+    capped = [
+        record["listing_price"]
+        for record in records
+        if record["listing_mileage"] < 50000
+    ]
+    assert_rank_error(store.get_sketch(2018, "Honda", "Civic", max_mileage=49999), capped)
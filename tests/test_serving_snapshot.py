@@ -0,0 +1,152 @@
+import json
+import os
+
+import pytest
+
+from app.integration.comparables import ComparableIndex, ComparableTablesBuilder
+from app.integration.quantile_sketch import SegmentQuantileStore
+from app.integration.serving_snapshot import (
+    KEEP_GENERATIONS,
+    ServingSnapshotManager,
+    SnapshotQuantileStore,
+)
+
+ROWS = [
+    ("Honda", "Civic", 2012, 90000, 10000.0),
+    ("Honda", "Civic", 2012, 80000, 11000.0),
+    ("Honda", "Accord", 2013, 60000, 14000.0),
+    ("Toyota", "Camry", 2015, None, 15000.0),
+]
+
+
+def store_for(rows) -> SegmentQuantileStore:
+    store = SegmentQuantileStore()
+    store.add_rows(rows)
+    return store
+
+
+def comparables_for(rows) -> ComparableTablesBuilder:
+    builder = ComparableTablesBuilder()
+    builder.add_rows(row for row in rows if row[3] is not None)
+    return builder
+
+
+@pytest.fixture
+def directory(tmp_path):
+    return os.path.join(tmp_path, "serving")
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    path = os.path.join(tmp_path, "model.json")
+    with open(path, "w") as model_file:
+        json.dump(
+            {
+                "model_coef": [1.0, 2.0],
+                "model_intercept": 3.0,
+                "label_encoder_make_classes": ["Honda", "Toyota"],
+                "label_encoder_model_classes": ["Accord", "Camry", "Civic"],
+            },
+            model_file,
+        )
+    return path
+
+
+def publish(manager, rows, model_path) -> int:
+    return manager.publish(
+        store_for(rows), model_path=model_path, comparables=comparables_for(rows)
+    )
+
+
+def snapshot_files(directory) -> list:
+    return sorted(name for name in os.listdir(directory) if name.endswith(".bin"))
+
+
+def test_publish_serves_sketches_counts_comparables_and_model(directory, model_path):
+    manager = ServingSnapshotManager(directory, refresh_interval=0)
+    assert manager.current() is None
+
+    assert publish(manager, ROWS, model_path) == 1
+
+    snapshot = manager.current()
+    quantiles = SnapshotQuantileStore(manager)
+    expected = store_for(ROWS)
+    assert snapshot.generation == 1
+    assert quantiles.get_sketch(2012, "honda", "civic").quantiles([0, 1]) == [
+        10000.0,
+        11000.0,
+    ]
+    assert quantiles.get_sketch(2012, "Honda", "Civic", max_mileage=85000).count == 1
+    assert quantiles.get_sketch(2015, "Toyota", "Camry", max_mileage=85000) is None
+    assert quantiles.get_sketch(2020, "Kia", "Soul") is None
+    assert quantiles.segment_count(2012, "honda", "civic") == 2
+    assert quantiles.segment_count(2020, "kia", "soul") == 0
+    assert snapshot.quantile_store().segments.keys() == expected.segments.keys()
+
+    nearest = ComparableIndex(manager).nearest(2013, "Honda", "Civic", 70000, k=2)
+    assert [(comparable.year, comparable.model) for comparable in nearest] == [
+        (2012, "civic"),
+        (2012, "civic"),
+    ]
+    assert snapshot.metadata["model"]["model_intercept"] == 3.0
+    assert snapshot.table("make_classes").find(b"Toyota") == 1
+
+
+def test_readers_swap_to_a_new_generation(directory, model_path):
+    publisher = ServingSnapshotManager(directory)
+    reader = ServingSnapshotManager(directory, refresh_interval=0)
+    publish(publisher, ROWS[:1], model_path)
+    old = reader.current()
+
+    publish(publisher, ROWS, model_path)
+
+    new = reader.current()
+    assert (old.generation, new.generation) == (1, 2)
+    assert SnapshotQuantileStore(reader).segment_count(2012, "honda", "civic") == 2
+    # The replaced mapping stays readable for requests still using it.
+    assert old.table("segment_counts").find(b"2012|honda|civic") == 0
+
+
+def test_readers_wait_for_the_refresh_interval(directory, model_path):
+    publisher = ServingSnapshotManager(directory)
+    reader = ServingSnapshotManager(directory, refresh_interval=3600)
+    publish(publisher, ROWS, model_path)
+    assert reader.current().generation == 1
+
+    publish(publisher, ROWS, model_path)
+
+    assert reader.current().generation == 1
+    reader._checked_at = 0.0
+    assert reader.current().generation == 2
+
+
+def test_publish_keeps_the_newest_generations(directory, model_path):
+    manager = ServingSnapshotManager(directory, refresh_interval=0)
+    for _ in range(KEEP_GENERATIONS + 2):
+        generation = publish(manager, ROWS, model_path)
+
+    assert snapshot_files(directory) == [
+        f"snapshot-{kept:08d}.bin"
+        for kept in range(generation - KEEP_GENERATIONS + 1, generation + 1)
+    ]
+    assert manager.current().generation == generation
+
+
+def test_copies_leave_out_skipped_makes(directory, model_path):
+    manager = ServingSnapshotManager(directory, refresh_interval=0)
+    publish(manager, ROWS, model_path)
+    snapshot = manager.current()
+
+    store = snapshot.quantile_store(skip_makes={"honda"})
+    make_keys, runs, model_keys = snapshot.comparable_tables(
+        skip_makes={"toyota"}
+    ).build()
+
+    assert list(store.segments) == ["2015|toyota|camry"]
+    assert make_keys == [b"honda"]
+    assert model_keys == [b"accord", b"civic"]
+    assert [tuple(runs[0][index : index + 4]) for index in range(0, 12, 4)] == [
+        (2012, 80000, 11000.0, 1),
+        (2012, 90000, 10000.0, 1),
+        (2013, 60000, 14000.0, 0),
+    ]
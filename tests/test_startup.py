@@ -0,0 +1,54 @@
+import os
+
+import pytest
+from sqlalchemy import func, select
+
+from app.core.config import config
+from app.core.database.session import async_session_factory
+from app.core.server import create_app
+from app.integration.serving_snapshot import serving_snapshot
+from app.models.estimate import Vehicle
+from benchmarks.estimator_backends import synthetic_listings
+from tests.utils import run
+
+pytestmark = pytest.mark.usefixtures("migrated_database")
+
+ROWS = 500
+
+
+@pytest.fixture
+def snapshot_file(tmp_path, monkeypatch):
+    df = synthetic_listings(ROWS)
+    df.insert(0, "vin", [f"VIN{index:012d}" for index in range(ROWS)])
+    df["dealer_state"] = "TX"
+    df["dealer_zip"] = "78701"
+    df["last_seen_date"] = "2022-08-17"
+    path = os.path.join(tmp_path, "snapshot.txt")
+    df.to_csv(path, sep="|", index=False)
+
+    monkeypatch.setattr(config, "DATA_FILE_PATH", path)
+    monkeypatch.setattr(
+        config, "ZIP_CENTROIDS_FILE_PATH", os.path.join(tmp_path, "missing.txt")
+    )
+    return path
+
+
+async def start_and_stop() -> int:
+    """
+    Runs the application's startup and shutdown, as the server does for
+    each worker, and returns the number of vehicles loaded.
+    """
+    app = create_app()
+    async with app.router.lifespan_context(app):
+        async with async_session_factory() as db_session:
+            result = await db_session.execute(select(func.count()).select_from(Vehicle))
+            return result.scalar()
+
+
+def test_startup_loads_and_publishes_once(snapshot_file):
+    assert run(start_and_stop()) == ROWS
+    generation = serving_snapshot.current().generation
+
+    # A later worker finds the data and the snapshot in place.
+    assert run(start_and_stop()) == ROWS
+    assert serving_snapshot.current().generation == generation
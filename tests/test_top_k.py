@@ -0,0 +1,182 @@
+import asyncio
+import multiprocessing
+import os
+import random
+from collections import Counter
+
+import pytest
+
+from app.utils.top_k import SpaceSavingCounter
+
+CAPACITY = 50
+
+
+def zipf_stream(count: int, keys: int, seed: int) -> list:
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, keys + 1)]
+    return [(key,) for key in rng.choices(range(keys), weights=weights, k=count)]
+
+
+def assert_space_saving_bounds(counter: SpaceSavingCounter, stream: list) -> None:
+    exact = Counter(stream)
+    assert len(counter.counts) <= counter.capacity
+    assert sum(counter.counts.values()) == counter.total == len(stream)
+    for key, count in counter.counts.items():
+        assert count - counter.errors[key] <= exact[key] <= count, key
+    for key, count in exact.items():
+        if count > len(stream) / counter.capacity:
+            assert key in counter.counts, key
+
+
+def test_counts_stay_within_the_space_saving_bounds():
+    stream = zipf_stream(20000, keys=1000, seed=1)
+    counter = SpaceSavingCounter(capacity=CAPACITY)
+    for key in stream:
+        counter.add(key)
+
+    assert_space_saving_bounds(counter, stream)
+    assert [key for key, _ in counter.top(3)] == [(0,), (1,), (2,)]
+
+
+def test_evicts_the_lowest_count_after_increments():
+    counter = SpaceSavingCounter(capacity=3)
+    for key in ["a", "b", "c", "a", "c", "a"]:
+        counter.add(key)
+
+    # "b" has the lowest count even though "a" and "c" were pushed first.
+    counter.add("d")
+    assert counter.counts == {"a": 3, "c": 2, "d": 2}
+    assert counter.errors["d"] == 1
+
+    counter.add("d")
+    counter.add("e", count=5)
+    assert counter.counts == {"a": 3, "d": 3, "e": 7}
+
+
+def test_eviction_follows_decay_and_load(tmp_path):
+    path = str(tmp_path / "counter.json")
+    counter = SpaceSavingCounter(capacity=2)
+    counter.add(("a",), count=10)
+    counter.add(("b",), count=4)
+    counter.decay()
+    counter.save(path)
+
+    restored = SpaceSavingCounter(capacity=2)
+    restored.load(path)
+    restored.add(("c",))
+
+    assert restored.counts == {("a",): 5, ("c",): 3}
+
+
+def test_merge_adds_counts_and_keeps_the_largest():
+    first = SpaceSavingCounter(capacity=2)
+    first.add(("a",), count=5)
+    first.add(("b",), count=1)
+    second = SpaceSavingCounter(capacity=2)
+    second.add(("b",), count=3)
+    second.add(("c",), count=2)
+
+    first.merge(second)
+
+    assert first.counts == {("a",): 5, ("b",): 4}
+    assert first.total == 11
+    first.add(("d",))
+    assert first.counts == {("a",): 5, ("d",): 5}
+
+
+def test_save_replaces_the_file_atomically(tmp_path):
+    path = str(tmp_path / "counter.json")
+    counter = SpaceSavingCounter(capacity=4)
+    counter.add(("a",), count=2)
+    counter.epoch = "7"
+    counter.save(path)
+    counter.add(("b",))
+    counter.save(path)
+
+    restored = SpaceSavingCounter()
+    restored.load(path)
+
+    assert os.listdir(tmp_path) == ["counter.json"]
+    assert restored.counts == {("a",): 2, ("b",): 1}
+    assert (restored.capacity, restored.total, restored.epoch) == (4, 3, "7")
+
+
+@pytest.mark.parametrize("content", ['{"capacity": 4, "tot', '{"items": 3}', "[]"])
+def test_load_rejects_a_corrupt_file_and_keeps_its_counts(tmp_path, content):
+    path = tmp_path / "counter.json"
+    path.write_text(content)
+    counter = SpaceSavingCounter(capacity=4)
+    counter.add(("a",))
+
+    with pytest.raises(ValueError):
+        counter.load(str(path))
+    assert counter.counts == {("a",): 1}
+
+
+def share_from_worker(state_path: str, keys: list, rounds: int) -> None:
+    from app.controllers.estimate_controller import popular_segments
+    from app.controllers.estimate_prewarm import EstimatePrewarmer
+
+    prewarmer = EstimatePrewarmer(
+        top_k=10, interval=0, check_interval=0, max_load=1, state_path=state_path
+    )
+
+    async def share_rounds():
+        for _ in range(rounds):
+            for key in keys:
+                popular_segments.add(key)
+            await prewarmer.share_popularity()
+
+    asyncio.run(share_rounds())
+
+
+def test_workers_merge_into_the_shared_popularity_file(tmp_path):
+    state_path = str(tmp_path / "popular.json")
+    (tmp_path / "popular.json").write_text("not json")
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(
+            target=share_from_worker,
+            args=(state_path, [(2012, "honda", "civic"), (2015, make, "x")], 20),
+        )
+        for make in ("kia", "ford")
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    shared = SpaceSavingCounter()
+    shared.load(state_path)
+
+    assert [worker.exitcode for worker in workers] == [0, 0]
+    assert shared.total == 80
+    assert shared.counts == {
+        (2012, "honda", "civic"): 40,
+        (2015, "kia", "x"): 20,
+        (2015, "ford", "x"): 20,
+    }
+
+
+def test_shared_counts_decay_once_per_generation(tmp_path, monkeypatch):
+    from app.controllers import estimate_prewarm
+
+    popular_segments = SpaceSavingCounter()
+    monkeypatch.setattr(estimate_prewarm, "popular_segments", popular_segments)
+    prewarmer = estimate_prewarm.EstimatePrewarmer(
+        top_k=10,
+        interval=0,
+        check_interval=0,
+        max_load=1,
+        state_path=str(tmp_path / "popular.json"),
+    )
+
+    async def warm_twice():
+        popular_segments.add(("a",), count=8)
+        first = await prewarmer.share_popularity(generation=(1, "model"))
+        # Another worker reaching the same generation does not age it again.
+        second = await prewarmer.share_popularity(generation=(1, "model"))
+        third = await prewarmer.share_popularity(generation=(2, "model"))
+        return first.counts, second.counts, third.counts
+
+    assert asyncio.run(warm_twice()) == ({("a",): 4}, {("a",): 4}, {("a",): 2})
@@ -0,0 +1,18 @@
+import asyncio
+
+from app.core.database.session import engine
+
+
+def run(coroutine):
+    """
+    Runs a coroutine on a new event loop and disposes of the database
+    engine's pooled connections afterwards, as they belong to that loop.
+    """
+
+    async def run_and_dispose():
+        try:
+            return await coroutine
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(run_and_dispose())